@@ -20,6 +20,10 @@ def create_app():
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Create tables if they don't exist
     with app.app_context():
         db.create_all()
@@ -64,6 +68,14 @@ def create_celery_app(app=None):
                     'day_of_week': 1,  # Monday
                 },
             },
+            'ensure-partitions': {
+                'task': 'app.tasks.maintain_partitions',
+                'schedule': {
+                    'minute': 0,
+                    'hour': 1,
+                    'day_of_month': 1,
+                },
+            },
             'cleanup-old-data': {
                 'task': 'app.tasks.cleanup_old_data',
                 'schedule': {
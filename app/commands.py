@@ -0,0 +1,43 @@
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask):
+    """Register maintenance commands on the Flask CLI"""
+
+    @app.cli.command('rebuild-current-state')
+    def rebuild_current_state_command():
+        """Regenerate keyword_current_state from ranking history."""
+        from app.utils.current_state import rebuild_current_states
+
+        count = rebuild_current_states()
+        click.echo(f"Rebuilt current state for {count} keywords")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Recompute weekly and monthly rollups from ranking history."""
+        from app.utils.rollups import rebuild_rollups
+
+        count = rebuild_rollups()
+        click.echo(f"Rebuilt {count} rollup rows")
+
+    @app.cli.command('export-history')
+    @click.argument('table', type=click.Choice(['rankings', 'changes']))
+    @click.option('--format', 'export_format', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+    @click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First date to include.')
+    @click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last date to include.')
+    @click.option('--keyword-id', 'keyword_ids', type=int, multiple=True, help='Only export this keyword (repeatable).')
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default stdout).')
+    def export_history_command(table, export_format, start, end, keyword_ids, output):
+        """Stream rankings or ranking changes as NDJSON or CSV."""
+        from app.utils.exporter import generate_export
+
+        chunks = generate_export(
+            table,
+            export_format,
+            start_date=start.date() if start else None,
+            end_date=end.date() if end else None,
+            keyword_ids=keyword_ids or None
+        )
+        for chunk in chunks:
+            output.write(chunk)
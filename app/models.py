@@ -5,6 +5,23 @@ import json
 db = SQLAlchemy()
 
 
+def dialect_insert(model):
+    """
+    Return an INSERT for the bound database dialect supporting ON CONFLICT
+    
+    Args:
+        model: Model class to insert into
+        
+    Returns:
+        PostgreSQL (or SQLite, for local development) insert construct
+    """
+    if db.engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+
 class Keyword(db.Model):
     __tablename__ = 'keywords'
     
@@ -17,6 +34,8 @@ class Keyword(db.Model):
     # Relationships
     rankings = db.relationship('Ranking', backref='keyword_rel', lazy=True, cascade='all, delete-orphan')
     changes = db.relationship('RankingChange', backref='keyword_rel', lazy=True, cascade='all, delete-orphan')
+    competitor_positions = db.relationship('CompetitorPosition', backref='keyword_rel', lazy=True, cascade='all, delete-orphan')
+    current_state = db.relationship('KeywordCurrentState', backref='keyword_rel', uselist=False, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Keyword {self.keyword} for {self.domain}>'
@@ -36,8 +55,14 @@ class Keyword(db.Model):
 
 
 class Ranking(db.Model):
+    # Partitioned by month on check_date in PostgreSQL (see migrations/init.sql)
     __tablename__ = 'rankings'
+    __table_args__ = (
+        db.UniqueConstraint('keyword_id', 'check_date', name='uq_rankings_keyword_date'),
+    )
     
+    # PostgreSQL's primary key also includes the partition key (see migrations/init.sql);
+    # ids come from one sequence, so the ORM identifies rows by id alone
     id = db.Column(db.Integer, primary_key=True)
     keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id'), nullable=False)
     position = db.Column(db.Integer, nullable=True)  # None if not found in top 100
@@ -66,8 +91,14 @@ class Ranking(db.Model):
 
 
 class RankingChange(db.Model):
+    # Partitioned by month on change_date in PostgreSQL (see migrations/init.sql)
     __tablename__ = 'ranking_changes'
+    __table_args__ = (
+        db.UniqueConstraint('keyword_id', 'change_date', name='uq_ranking_changes_keyword_date'),
+    )
     
+    # PostgreSQL's primary key also includes the partition key (see migrations/init.sql);
+    # ids come from one sequence, so the ORM identifies rows by id alone
     id = db.Column(db.Integer, primary_key=True)
     keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id'), nullable=False)
     previous_position = db.Column(db.Integer, nullable=True)
@@ -120,4 +151,147 @@ class RankingChange(db.Model):
                 magnitude = 'moderate'
             else:
                 magnitude = 'minor'
-            return 'down', magnitude, change
\ No newline at end of file
+            return 'down', magnitude, change
+
+
+class KeywordCurrentState(db.Model):
+    """Latest ranking and change per keyword, maintained on every save"""
+    __tablename__ = 'keyword_current_state'
+    
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id'), primary_key=True)
+    position = db.Column(db.Integer, nullable=True)
+    url = db.Column(db.Text, nullable=True)
+    title = db.Column(db.Text, nullable=True)
+    found_in_top_100 = db.Column(db.Boolean, default=False)
+    serp_features = db.Column(db.JSON)
+    check_date = db.Column(db.Date, nullable=False)
+    previous_position = db.Column(db.Integer, nullable=True)
+    position_change = db.Column(db.Integer, nullable=True)
+    change_direction = db.Column(db.String(50), nullable=True)
+    change_magnitude = db.Column(db.String(50), nullable=True)
+    change_date = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<KeywordCurrentState {self.keyword_id}: pos {self.position} on {self.check_date}>'
+    
+    def to_dict(self):
+        return {
+            'keyword_id': self.keyword_id,
+            'position': self.position,
+            'url': self.url,
+            'title': self.title,
+            'found_in_top_100': self.found_in_top_100,
+            'serp_features': self.serp_features,
+            'check_date': self.check_date.isoformat() if self.check_date else None,
+            'previous_position': self.previous_position,
+            'position_change': self.position_change,
+            'change_direction': self.change_direction,
+            'change_magnitude': self.change_magnitude,
+            'change_date': self.change_date.isoformat() if self.change_date else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class CompetitorPosition(db.Model):
+    """Best position of one competitor domain in a keyword's SERP on a check date"""
+    __tablename__ = 'competitor_positions'
+    __table_args__ = (
+        db.UniqueConstraint('keyword_id', 'check_date', 'domain', name='uq_competitor_positions_keyword_date_domain'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id'), nullable=False)
+    domain = db.Column(db.String(255), nullable=False)
+    position = db.Column(db.Integer, nullable=True)  # None if not found in top 100
+    url = db.Column(db.Text, nullable=True)
+    check_date = db.Column(db.Date, nullable=False, default=date.today)
+    
+    def __repr__(self):
+        return f'<CompetitorPosition {self.keyword_id} {self.domain}: pos {self.position} on {self.check_date}>'
+    
+    def to_dict(self):
+        return {
+            'keyword_id': self.keyword_id,
+            'domain': self.domain,
+            'position': self.position,
+            'url': self.url,
+            'check_date': self.check_date.isoformat() if self.check_date else None
+        }
+
+
+class RankCheckRun(db.Model):
+    """One weekly sweep, identified by the Celery task ID that started it"""
+    __tablename__ = 'rank_check_runs'
+    
+    id = db.Column(db.String(255), primary_key=True)
+    check_date = db.Column(db.Date, nullable=False, default=date.today)
+    status = db.Column(db.String(50), nullable=False, default='running')  # 'running', 'completed'
+    total_keywords = db.Column(db.Integer, nullable=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    items = db.relationship('RankCheckRunItem', backref='run', lazy=True, cascade='all, delete-orphan')
+    
+    def __repr__(self):
+        return f'<RankCheckRun {self.id}: {self.status}>'
+
+
+class RankCheckRunItem(db.Model):
+    """Ledger entry marking one keyword as saved within a run"""
+    __tablename__ = 'rank_check_run_items'
+    
+    run_id = db.Column(db.String(255), db.ForeignKey('rank_check_runs.id', ondelete='CASCADE'), primary_key=True)
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id', ondelete='CASCADE'), primary_key=True)
+    result = db.Column(db.JSON)  # Save result reused when the run is resumed
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RankCheckRunItem {self.run_id}: keyword {self.keyword_id}>'
+
+
+class RankingRollup(db.Model):
+    """Aggregate ranking statistics of one domain over one week or month"""
+    __tablename__ = 'ranking_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('domain', 'period', 'period_start', name='uq_ranking_rollups_domain_period'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    domain = db.Column(db.String(255), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'week', 'month'
+    period_start = db.Column(db.Date, nullable=False)
+    keyword_count = db.Column(db.Integer, nullable=False, default=0)
+    ranked_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_position = db.Column(db.Float, nullable=True)
+    top_3_count = db.Column(db.Integer, nullable=False, default=0)
+    top_10_count = db.Column(db.Integer, nullable=False, default=0)
+    improvements = db.Column(db.Integer, nullable=False, default=0)
+    declines = db.Column(db.Integer, nullable=False, default=0)
+    new_rankings = db.Column(db.Integer, nullable=False, default=0)
+    lost_rankings = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RankingRollup {self.domain} {self.period} {self.period_start}>'
+    
+    @property
+    def ranked_share(self):
+        return round(self.ranked_count / self.keyword_count * 100, 1) if self.keyword_count else 0
+    
+    def to_dict(self):
+        return {
+            'domain': self.domain,
+            'period': self.period,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'keyword_count': self.keyword_count,
+            'ranked_count': self.ranked_count,
+            'ranked_share': self.ranked_share,
+            'avg_position': round(self.avg_position, 1) if self.avg_position is not None else None,
+            'top_3_count': self.top_3_count,
+            'top_10_count': self.top_10_count,
+            'improvements': self.improvements,
+            'declines': self.declines,
+            'new_rankings': self.new_rankings,
+            'lost_rankings': self.lost_rankings
+        }
@@ -1,8 +1,15 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context
 from datetime import datetime, date, timedelta
 import logging
-from app.models import db, Keyword, Ranking, RankingChange
+from app.models import db, Keyword, Ranking, CompetitorPosition
 from app.tasks import check_single_keyword, weekly_rank_check, send_report_email
+from app.utils.current_state import get_current_states, get_current_states_page, API_FIELDS, DEFAULT_API_FIELDS
+from app.utils.exporter import generate_export, EXPORT_TABLES, EXPORT_FORMATS
+from app.utils.cache import get_cached, invalidate_dashboard_cache, DASHBOARD_CACHE_KEY
+from app.utils.report_generator import attach_trend_metrics
+from app.utils.trend_analytics import get_trend_metrics
+from app.utils.anomaly_detection import flag_significant_moves
+from app.utils.rollups import get_rollups, ROLLUP_PERIODS
 from app.config import Config
 
 logger = logging.getLogger(__name__)
@@ -20,40 +27,12 @@ def index():
 def dashboard():
     """Main dashboard showing current rankings"""
     try:
-        # Get all active keywords with their latest rankings
-        keywords = db.session.query(Keyword).filter_by(is_active=True).all()
-        
-        dashboard_data = []
-        for keyword in keywords:
-            latest_ranking = Ranking.query.filter_by(
-                keyword_id=keyword.id
-            ).order_by(Ranking.check_date.desc()).first()
-            
-            latest_change = RankingChange.query.filter_by(
-                keyword_id=keyword.id
-            ).order_by(RankingChange.change_date.desc()).first()
-            
-            keyword_data = {
-                'id': keyword.id,
-                'keyword': keyword.keyword,
-                'domain': keyword.domain,
-                'position': latest_ranking.position if latest_ranking else None,
-                'url': latest_ranking.url if latest_ranking else None,
-                'found_in_top_100': latest_ranking.found_in_top_100 if latest_ranking else False,
-                'last_checked': latest_ranking.check_date if latest_ranking else None,
-                'change_direction': latest_change.change_direction if latest_change else 'none',
-                'change_magnitude': latest_change.change_magnitude if latest_change else 'none',
-                'position_change': latest_change.position_change if latest_change else 0,
-                'previous_position': latest_change.previous_position if latest_change else None
-            }
-            dashboard_data.append(keyword_data)
-        
-        # Calculate summary statistics
-        stats = calculate_dashboard_stats(dashboard_data)
+        payload = get_cached(DASHBOARD_CACHE_KEY, build_dashboard_payload)
         
         return render_template('dashboard.html', 
-                             keywords=dashboard_data, 
-                             stats=stats)
+                             keywords=payload['keywords'], 
+                             stats=payload['stats'],
+                             rollups=payload.get('rollups', []))
         
     except Exception as e:
         logger.error(f"Error loading dashboard: {e}")
@@ -63,30 +42,51 @@ def dashboard():
 
 @bp.route('/api/rankings')
 def api_rankings():
-    """JSON API endpoint for current rankings"""
+    """
+    JSON API endpoint for current rankings
+    
+    Query parameters:
+        cursor: next_cursor value from the previous page
+        limit: Page size (default 100, max 1000)
+        fields: Comma-separated fields to return
+        domain: Only keywords tracked for this domain
+        min_position / max_position: Position range filter
+        direction: Change direction filter (up, down, new, lost, same)
+    """
     try:
-        keywords = Keyword.query.filter_by(is_active=True).all()
-        results = []
-        
-        for keyword in keywords:
-            latest_ranking = keyword.latest_ranking
-            if latest_ranking:
-                results.append({
-                    'keyword_id': keyword.id,
-                    'keyword': keyword.keyword,
-                    'domain': keyword.domain,
-                    'position': latest_ranking.position,
-                    'url': latest_ranking.url,
-                    'title': latest_ranking.title,
-                    'found_in_top_100': latest_ranking.found_in_top_100,
-                    'check_date': latest_ranking.check_date.isoformat(),
-                    'serp_features': latest_ranking.serp_features
-                })
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(DEFAULT_API_FIELDS)
+        unknown = [f for f in fields if f not in API_FIELDS]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown fields: {', '.join(unknown)}"
+            }), 400
+        
+        direction = request.args.get('direction')
+        if direction and direction not in ('up', 'down', 'new', 'lost', 'same'):
+            return jsonify({
+                'success': False,
+                'error': f"Invalid direction: {direction}"
+            }), 400
+        
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        
+        results, next_cursor = get_current_states_page(
+            fields=fields,
+            after_keyword_id=request.args.get('cursor', type=int),
+            limit=limit,
+            domain=request.args.get('domain'),
+            min_position=request.args.get('min_position', type=int),
+            max_position=request.args.get('max_position', type=int),
+            direction=direction
+        )
         
         return jsonify({
             'success': True,
             'data': results,
             'total': len(results),
+            'next_cursor': next_cursor,
             'timestamp': datetime.utcnow().isoformat()
         })
         
@@ -108,9 +108,11 @@ def api_keyword_history(keyword_id):
         
         # Get historical rankings
         start_date = date.today() - timedelta(days=days)
+        # Bounded on both sides so PostgreSQL only scans the matching monthly partitions
         rankings = Ranking.query.filter(
             Ranking.keyword_id == keyword_id,
-            Ranking.check_date >= start_date
+            Ranking.check_date >= start_date,
+            Ranking.check_date <= date.today()
         ).order_by(Ranking.check_date.asc()).all()
         
         history_data = []
@@ -138,6 +140,146 @@ def api_keyword_history(keyword_id):
         }), 500
 
 
+@bp.route('/api/keyword/<int:keyword_id>/competitors')
+def api_keyword_competitors(keyword_id):
+    """Get competitor position history for a specific keyword"""
+    try:
+        days = request.args.get('days', 30, type=int)
+        
+        keyword = Keyword.query.get_or_404(keyword_id)
+        
+        start_date = date.today() - timedelta(days=days)
+        positions = CompetitorPosition.query.filter(
+            CompetitorPosition.keyword_id == keyword_id,
+            CompetitorPosition.check_date >= start_date
+        ).order_by(CompetitorPosition.check_date.asc()).all()
+        
+        # One series per competitor domain
+        competitors = {}
+        for competitor in positions:
+            competitors.setdefault(competitor.domain, []).append({
+                'date': competitor.check_date.isoformat(),
+                'position': competitor.position,
+                'url': competitor.url
+            })
+        
+        return jsonify({
+            'success': True,
+            'keyword': keyword.keyword,
+            'domain': keyword.domain,
+            'competitors': competitors,
+            'days': days
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting competitor positions: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@bp.route('/api/rollups')
+def api_rollups():
+    """
+    Pre-aggregated ranking statistics per domain and period
+    
+    Query parameters:
+        period: week (default) or month
+        domain: Only this domain
+        start / end: Range of period start dates (YYYY-MM-DD, inclusive)
+        limit: Only the latest N periods
+    """
+    try:
+        period = request.args.get('period', 'week')
+        if period not in ROLLUP_PERIODS:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid period: {period}"
+            }), 400
+        
+        domain = request.args.get('domain')
+        start_date = request.args.get('start')
+        end_date = request.args.get('end')
+        
+        rollups = get_rollups(
+            period,
+            domains=[domain] if domain else None,
+            start=date.fromisoformat(start_date) if start_date else None,
+            end=date.fromisoformat(end_date) if end_date else None,
+            limit=request.args.get('limit', type=int)
+        )
+        
+        return jsonify({
+            'success': True,
+            'period': period,
+            'data': rollups,
+            'total': len(rollups)
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in API rollups endpoint: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@bp.route('/api/export/<table>')
+def api_export(table):
+    """
+    Stream ranking history as NDJSON or CSV
+    
+    Query parameters:
+        format: ndjson (default) or csv
+        start / end: Date range (YYYY-MM-DD, inclusive)
+        keyword_ids: Comma-separated keyword IDs
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if table not in EXPORT_TABLES or export_format not in EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Unsupported export: {table} as {export_format}"
+            }), 400
+        
+        start_date = request.args.get('start')
+        end_date = request.args.get('end')
+        keyword_ids = request.args.get('keyword_ids')
+        
+        chunks = generate_export(
+            table,
+            export_format,
+            start_date=date.fromisoformat(start_date) if start_date else None,
+            end_date=date.fromisoformat(end_date) if end_date else None,
+            keyword_ids=[int(k) for k in keyword_ids.split(',')] if keyword_ids else None
+        )
+        
+        filename = f"{table}.{export_format}"
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error exporting {table}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @bp.route('/trigger-check', methods=['POST'])
 def trigger_manual_check():
     """Trigger manual rank check"""
@@ -178,26 +320,24 @@ def trigger_report():
             return redirect(url_for('main.dashboard'))
         
         # Get current ranking data
-        keywords = Keyword.query.filter_by(is_active=True).all()
+        states = get_current_states(ranked_only=True)
         report_data = []
         
-        for keyword in keywords:
-            latest_ranking = keyword.latest_ranking
-            latest_change = RankingChange.query.filter_by(
-                keyword_id=keyword.id
-            ).order_by(RankingChange.change_date.desc()).first()
-            
-            if latest_ranking:
-                keyword_data = {
-                    'keyword': keyword.keyword,
-                    'position': latest_ranking.position,
-                    'url': latest_ranking.url,
-                    'found_in_top_100': latest_ranking.found_in_top_100,
-                    'change_direction': latest_change.change_direction if latest_change else 'none',
-                    'change_magnitude': latest_change.change_magnitude if latest_change else 'none',
-                    'position_change': latest_change.position_change if latest_change else 0
-                }
-                report_data.append(keyword_data)
+        for state in states:
+            keyword_data = {
+                'keyword_id': state.keyword_id,
+                'keyword': state.keyword,
+                'position': state.position,
+                'url': state.url,
+                'found_in_top_100': state.found_in_top_100,
+                'change_direction': state.change_direction or 'none',
+                'change_magnitude': state.change_magnitude or 'none',
+                'position_change': state.position_change or 0
+            }
+            report_data.append(keyword_data)
+        
+        attach_trend_metrics(report_data)
+        flag_significant_moves(report_data)
         
         # Send report
         task = send_report_email.delay(report_data, recipient)
@@ -250,6 +390,7 @@ def add_keyword():
         
         db.session.add(new_keyword)
         db.session.commit()
+        invalidate_dashboard_cache()
         
         flash(f'Keyword "{keyword_text}" added successfully', 'success')
         return redirect(url_for('main.keywords_list'))
@@ -268,6 +409,7 @@ def toggle_keyword(keyword_id):
         keyword = Keyword.query.get_or_404(keyword_id)
         keyword.is_active = not keyword.is_active
         db.session.commit()
+        invalidate_dashboard_cache()
         
         status = 'activated' if keyword.is_active else 'deactivated'
         flash(f'Keyword "{keyword.keyword}" {status}', 'success')
@@ -310,6 +452,45 @@ def health_check():
         }), 500
 
 
+def build_dashboard_payload():
+    """Build the cacheable dashboard keywords list and summary statistics"""
+    # Get all active keywords with their latest rankings and changes
+    states = get_current_states()
+    
+    # History trends for every active keyword, computed in one batch
+    trends = get_trend_metrics()
+    
+    dashboard_data = []
+    for state in states:
+        trend = trends.get(state.keyword_id, {})
+        keyword_data = {
+            'id': state.keyword_id,
+            'keyword': state.keyword,
+            'domain': state.domain,
+            'position': state.position,
+            'url': state.url,
+            'found_in_top_100': state.found_in_top_100 or False,
+            'last_checked': state.check_date.isoformat() if state.check_date else None,
+            'change_direction': state.change_direction or 'none',
+            'change_magnitude': state.change_magnitude or 'none',
+            'position_change': state.position_change or 0,
+            'previous_position': state.previous_position,
+            'trend': trend.get('trend', 'insufficient_data'),
+            'trend_slope': trend.get('slope'),
+            'volatility': trend.get('volatility'),
+            'top_10_share': trend.get('top_10_share')
+        }
+        dashboard_data.append(keyword_data)
+    
+    # Calculate summary statistics
+    stats = calculate_dashboard_stats(dashboard_data)
+    
+    # Long-range trend comes from the weekly rollups, not the raw history
+    rollups = get_rollups('week', limit=Config.ROLLUP_DASHBOARD_WEEKS)
+    
+    return {'keywords': dashboard_data, 'stats': stats, 'rollups': rollups}
+
+
 def calculate_dashboard_stats(keywords_data):
     """Calculate summary statistics for dashboard"""
     total = len(keywords_data)
@@ -323,7 +504,9 @@ def calculate_dashboard_stats(keywords_data):
             'top_3_count': 0,
             'improvements': 0,
             'declines': 0,
-            'new_rankings': 0
+            'new_rankings': 0,
+            'improving_trends': 0,
+            'declining_trends': 0
         }
     
     ranked = sum(1 for k in keywords_data if k['found_in_top_100'])
@@ -336,6 +519,8 @@ def calculate_dashboard_stats(keywords_data):
     improvements = sum(1 for k in keywords_data if k['change_direction'] == 'up')
     declines = sum(1 for k in keywords_data if k['change_direction'] == 'down')
     new_rankings = sum(1 for k in keywords_data if k['change_direction'] == 'new')
+    improving_trends = sum(1 for k in keywords_data if k.get('trend') == 'improving')
+    declining_trends = sum(1 for k in keywords_data if k.get('trend') == 'declining')
     
     return {
         'total_keywords': total,
@@ -346,5 +531,7 @@ def calculate_dashboard_stats(keywords_data):
         'top_3_count': top_3,
         'improvements': improvements,
         'declines': declines,
-        'new_rankings': new_rankings
+        'new_rankings': new_rankings,
+        'improving_trends': improving_trends,
+        'declining_trends': declining_trends
     }
\ No newline at end of file
@@ -1,5 +1,7 @@
-from celery import Celery
-from datetime import datetime, date, timedelta
+from celery import Celery, Task, chord, group
+from celery.signals import worker_process_init
+from flask import has_app_context
+from datetime import date
 import logging
 import os
 
@@ -7,8 +9,39 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Flask app shared by every task run in this worker process
+_flask_app = None
+
+
+def get_flask_app():
+    """Return the worker-lifetime Flask app, creating it on first use"""
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
+@worker_process_init.connect
+def init_worker_flask_app(**kwargs):
+    """Build the Flask app once when each worker process starts"""
+    get_flask_app()
+
+
+class FlaskTask(Task):
+    """Task that runs inside an app context of the worker-lifetime Flask app"""
+    
+    def __call__(self, *args, **kwargs):
+        # Called from within the web app (e.g. eagerly): reuse its context
+        if has_app_context():
+            return self.run(*args, **kwargs)
+        
+        with get_flask_app().app_context():
+            return self.run(*args, **kwargs)
+
+
 # Initialize Celery with configuration
-celery = Celery('seo_tracker')
+celery = Celery('seo_tracker', task_cls=FlaskTask)
 
 # Configure Celery
 celery.conf.update(
@@ -26,70 +59,167 @@ celery.conf.update(
 
 
 @celery.task(bind=True)
-def weekly_rank_check(self):
+def weekly_rank_check(self, run_id=None):
     """
     Scheduled weekly task to check all keyword rankings
-    """
-    from app import create_app
-    flask_app = create_app()
     
-    with flask_app.app_context():
+    Splits the active keywords into chunks of RANK_CHECK_CHUNK_SIZE and
+    dispatches them as a chord, so the sweep is spread across all workers
+    and the report is sent once every chunk has finished.
+    
+    Progress is recorded per keyword in the run ledger under run_id, which
+    defaults to this task's ID and so survives retries. A retried or
+    restarted run only dispatches the keywords not completed yet.
+    
+    Args:
+        run_id: ID of a previous run to resume
+    """
+    try:
+        logger.info("Starting weekly rank check")
+        
+        # Import models and config within app context
+        from app.models import db, Keyword
+        from app.config import Config
+        from app.utils.run_ledger import start_run, get_completed_results
+        
+        run_id = run_id or self.request.id
+        
+        # Get all active keywords, ordered so rows sharing a search land in the same chunk
+        keyword_ids = [
+            keyword_id for (keyword_id,) in db.session.query(Keyword.id)
+            .filter_by(is_active=True)
+            .order_by(Keyword.keyword, Keyword.id)
+        ]
+        
+        if not keyword_ids:
+            logger.warning("No active keywords found")
+            return "No active keywords to check"
+        
+        # Get API key and target domain
+        api_key = Config.SERPAPI_KEY
+        if not api_key:
+            logger.error("SERPAPI_KEY not configured")
+            return "SERPAPI_KEY not configured"
+        
+        # Today's rows need their monthly partition; if it cannot be created
+        # they land in the default partition and are moved once it is
+        from app.utils.partitions import ensure_partitions
         try:
-            logger.info("Starting weekly rank check")
-            
-            # Import models and config within app context
-            from app.models import db, Keyword, Ranking, RankingChange
-            from app.utils.serpapi_client import get_keyword_ranking
-            from app.config import Config
-            
-            # Get all active keywords
-            keywords = Keyword.query.filter_by(is_active=True).all()
-            
-            if not keywords:
-                logger.warning("No active keywords found")
-                return "No active keywords to check"
-            
-            # Get API key and target domain
-            api_key = Config.SERPAPI_KEY
-            if not api_key:
-                logger.error("SERPAPI_KEY not configured")
-                return "SERPAPI_KEY not configured"
-            
-            results = []
-            
-            # Process each keyword
-            for keyword in keywords:
-                try:
-                    # Check ranking for this keyword
-                    ranking_data = get_keyword_ranking(
-                        keyword.keyword, 
-                        keyword.domain, 
-                        api_key
-                    )
-                    
-                    # Save ranking data
-                    ranking_result = save_ranking_data(keyword.id, ranking_data)
-                    results.append(ranking_result)
-                    
-                    logger.info(f"Checked keyword: {keyword.keyword} - Position: {ranking_data.get('position', 'Not found')}")
-                    
-                except Exception as e:
-                    logger.error(f"Error checking keyword {keyword.keyword}: {e}")
-                    results.append({
-                        'keyword_id': keyword.id,
-                        'keyword': keyword.keyword,
-                        'error': str(e)
-                    })
-            
-            # Generate and send report
-            send_weekly_report_task.delay(results)
-            
-            logger.info(f"Weekly rank check completed. Checked {len(results)} keywords")
-            return f"Checked {len(results)} keywords successfully"
-            
+            ensure_partitions()
         except Exception as e:
-            logger.error(f"Error in weekly_rank_check: {e}")
-            raise self.retry(exc=e, countdown=60, max_retries=3)
+            logger.error(f"Continuing rank check without partition maintenance: {e}")
+        
+        start_run(run_id, total_keywords=len(keyword_ids))
+        
+        # Skip keywords this run already saved before a crash or retry
+        completed = get_completed_results(run_id)
+        pending_ids = [keyword_id for keyword_id in keyword_ids if keyword_id not in completed]
+        if completed:
+            logger.info(f"Resuming run {run_id}: {len(completed)} keywords already done, {len(pending_ids)} remaining")
+        
+        if not pending_ids:
+            collect_weekly_results.delay([], run_id)
+            return f"Run {run_id} already complete"
+        
+        chunk_size = max(1, Config.RANK_CHECK_CHUNK_SIZE)
+        chunks = [pending_ids[i:i + chunk_size] for i in range(0, len(pending_ids), chunk_size)]
+        
+        # Fan out chunks across workers; the callback collects results and sends the report
+        chord(check_keyword_chunk.s(chunk, run_id) for chunk in chunks)(collect_weekly_results.s(run_id))
+        
+        logger.info(f"Weekly rank check dispatched {len(pending_ids)} keywords in {len(chunks)} chunks")
+        return f"Dispatched {len(pending_ids)} keywords in {len(chunks)} chunks"
+        
+    except Exception as e:
+        logger.error(f"Error in weekly_rank_check: {e}")
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+
+@celery.task(bind=True, max_retries=3)
+def check_keyword_chunk(self, keyword_ids, run_id=None):
+    """
+    Check rankings for one chunk of keywords
+    
+    A failing chunk is retried on its own, skipping the keywords it had
+    already saved. Once retries are exhausted the chunk reports its
+    keywords as errors so the chord still completes.
+    
+    Args:
+        keyword_ids: IDs of the keywords in this chunk
+        run_id: ID of the run ledger to record progress in
+    """
+    try:
+        from app.models import Keyword
+        from app.config import Config
+        
+        keywords = Keyword.query.filter(Keyword.id.in_(keyword_ids)).order_by(Keyword.id).all()
+        results = check_keywords(keywords, Config.SERPAPI_KEY, run_id=run_id)
+        
+        logger.info(f"Checked chunk of {len(results)} keywords")
+        return results
+        
+    except Exception as e:
+        logger.error(f"Error in check_keyword_chunk: {e}")
+        if self.request.retries >= self.max_retries:
+            return [{'keyword_id': keyword_id, 'error': str(e)} for keyword_id in keyword_ids]
+        raise self.retry(exc=e, countdown=60)
+
+
+@celery.task
+def collect_weekly_results(chunk_results, run_id=None):
+    """
+    Chord callback that merges per-chunk results and triggers the report
+    
+    Keywords completed before the run was resumed are taken from the run
+    ledger, so the report always covers the whole run.
+    
+    Args:
+        chunk_results: List of result lists, one per chunk
+        run_id: ID of the run ledger
+    """
+    results = [result for chunk in chunk_results for result in chunk]
+    
+    if run_id:
+        from app.utils.run_ledger import get_completed_results, finish_run
+        
+        checked_ids = {result.get('keyword_id') for result in results}
+        resumed = [
+            result for keyword_id, result in get_completed_results(run_id).items()
+            if keyword_id not in checked_ids
+        ]
+        results = resumed + results
+        finish_run(run_id)
+    
+    # Score every keyword's latest move against its own history
+    try:
+        from app.utils.anomaly_detection import flag_significant_moves
+        
+        flag_significant_moves(results)
+        for result in results:
+            if result.get('significant'):
+                logger.warning(
+                    f"Significant move for keyword {result.get('keyword')}: "
+                    f"{result.get('previous_position')} -> {result.get('position')} (z={result.get('z_score')})"
+                )
+    except Exception as e:
+        # Without scores the report falls back to listing every keyword
+        logger.error(f"Error detecting significant moves: {e}")
+    
+    # Fold this run into the current week's and month's rollups
+    try:
+        from app.utils.rollups import refresh_rollups
+        from app.utils.cache import invalidate_dashboard_cache
+        
+        refresh_rollups()
+        invalidate_dashboard_cache()
+    except Exception as e:
+        logger.error(f"Error refreshing rollups: {e}")
+    
+    # Generate and send report
+    send_weekly_report_task.delay(results)
+    
+    logger.info(f"Weekly rank check completed. Checked {len(results)} keywords")
+    return f"Checked {len(results)} keywords successfully"
 
 
 @celery.task(bind=True)
@@ -100,39 +230,35 @@ def check_single_keyword(self, keyword_id):
     Args:
         keyword_id: ID of the keyword to check
     """
-    from app import create_app
-    flask_app = create_app()
-    
-    with flask_app.app_context():
-        try:
-            from app.models import Keyword
-            from app.utils.serpapi_client import get_keyword_ranking
-            from app.config import Config
-            
-            keyword = Keyword.query.get(keyword_id)
-            if not keyword:
-                return f"Keyword with ID {keyword_id} not found"
-            
-            api_key = Config.SERPAPI_KEY
-            if not api_key:
-                return "SERPAPI_KEY not configured"
-            
-            # Check ranking
-            ranking_data = get_keyword_ranking(
-                keyword.keyword,
-                keyword.domain,
-                api_key
-            )
-            
-            # Save ranking data
-            result = save_ranking_data(keyword_id, ranking_data)
-            
-            logger.info(f"Single keyword check completed for: {keyword.keyword}")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in check_single_keyword: {e}")
-            raise self.retry(exc=e, countdown=30, max_retries=2)
+    try:
+        from app.models import Keyword
+        from app.utils.serpapi_client import get_keyword_ranking
+        from app.config import Config
+        
+        keyword = Keyword.query.get(keyword_id)
+        if not keyword:
+            return f"Keyword with ID {keyword_id} not found"
+        
+        api_key = Config.SERPAPI_KEY
+        if not api_key:
+            return "SERPAPI_KEY not configured"
+        
+        # Check ranking
+        ranking_data = get_keyword_ranking(
+            keyword.keyword,
+            keyword.domain,
+            api_key
+        )
+        
+        # Save ranking data
+        result = save_ranking_data(keyword_id, ranking_data)
+        
+        logger.info(f"Single keyword check completed for: {keyword.keyword}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in check_single_keyword: {e}")
+        raise self.retry(exc=e, countdown=30, max_retries=2)
 
 
 @celery.task
@@ -143,36 +269,88 @@ def send_weekly_report_task(ranking_results):
     Args:
         ranking_results: List of ranking result dictionaries
     """
-    from app import create_app
-    flask_app = create_app()
-    
-    with flask_app.app_context():
-        try:
-            from app.config import Config
-            from app.utils.email_sender import smtp_gmail_setup
-            
-            recipient_email = Config.RECIPIENT_EMAIL
-            if not recipient_email:
-                logger.error("RECIPIENT_EMAIL not configured")
-                return "RECIPIENT_EMAIL not configured"
-            
-            # Prepare ranking data with change information
-            report_data = prepare_report_data(ranking_results)
+    try:
+        from app.config import Config
+        from app.utils.email_sender import smtp_gmail_setup, parse_recipients
+        from app.utils.report_generator import group_ranking_data_by_domain, attach_trend_metrics
+        from app.utils.rollups import get_rollups
+        
+        recipients = parse_recipients(Config.RECIPIENT_EMAIL)
+        domain_recipients = {
+            domain: parse_recipients(subscribers)
+            for domain, subscribers in Config.DOMAIN_RECIPIENTS.items()
+        }
+        if not recipients and not any(domain_recipients.values()):
+            logger.error("RECIPIENT_EMAIL not configured")
+            return "RECIPIENT_EMAIL not configured"
+        
+        # Prepare ranking data with change information and history trends
+        report_data = attach_trend_metrics(prepare_report_data(ranking_results))
+        
+        # Long-range trend per domain, read from the weekly rollups
+        domain_reports = group_ranking_data_by_domain(report_data)
+        rollups = get_rollups('week', domains=list(domain_reports), limit=Config.ROLLUP_REPORT_WEEKS)
+        
+        # Domain subscribers get their own report, rendered and sent in parallel
+        domain_tasks = [
+            send_domain_report_task.s(domain, domain_reports[domain]['rankings'],
+                                      domain_reports[domain]['stats'], subscribers,
+                                      [rollup for rollup in rollups if rollup['domain'] == domain])
+            for domain, subscribers in domain_recipients.items()
+            if subscribers and domain in domain_reports
+        ]
+        if domain_tasks:
+            group(domain_tasks).apply_async()
+        
+        if not recipients:
+            logger.info(f"Dispatched {len(domain_tasks)} domain reports")
+            return f"Dispatched {len(domain_tasks)} domain reports"
+        
+        # Send the full report over one SMTP session
+        email_sender = smtp_gmail_setup()
+        success = email_sender.send_weekly_report(report_data, recipients, rollups=rollups)
+        
+        if success:
+            logger.info(f"Weekly report sent successfully to {len(recipients)} recipients, {len(domain_tasks)} domain reports dispatched")
+            return "Weekly report sent successfully"
+        else:
+            logger.error("Failed to send weekly report to some recipients")
+            return "Failed to send weekly report"
             
-            # Send email
-            email_sender = smtp_gmail_setup()
-            success = email_sender.send_weekly_report(report_data, recipient_email)
+    except Exception as e:
+        logger.error(f"Error sending weekly report: {e}")
+        return f"Error sending report: {e}"
+
+
+@celery.task
+def send_domain_report_task(domain, ranking_data, stats, recipients, rollups=None):
+    """
+    Render and send one domain's weekly report
+    
+    Args:
+        domain: Domain the report covers
+        ranking_data: Ranking results for this domain only
+        stats: Precomputed statistics for ranking_data
+        recipients: Subscriber addresses for this domain
+        rollups: Weekly rollup rows of this domain
+    """
+    try:
+        from app.utils.email_sender import smtp_gmail_setup
+        
+        email_sender = smtp_gmail_setup()
+        success = email_sender.send_weekly_report(ranking_data, recipients, stats=stats,
+                                                  domain=domain, rollups=rollups)
+        
+        if success:
+            logger.info(f"Weekly report for {domain} sent to {len(recipients)} recipients")
+            return f"Weekly report for {domain} sent successfully"
+        else:
+            logger.error(f"Failed to send weekly report for {domain}")
+            return f"Failed to send weekly report for {domain}"
             
-            if success:
-                logger.info(f"Weekly report sent successfully to {recipient_email}")
-                return "Weekly report sent successfully"
-            else:
-                logger.error("Failed to send weekly report")
-                return "Failed to send weekly report"
-                
-        except Exception as e:
-            logger.error(f"Error sending weekly report: {e}")
-            return f"Error sending report: {e}"
+    except Exception as e:
+        logger.error(f"Error sending weekly report for {domain}: {e}")
+        return f"Error sending report for {domain}: {e}"
 
 
 @celery.task
@@ -182,140 +360,329 @@ def send_report_email(report_data, recipient_email):
     
     Args:
         report_data: Ranking data for the report
-        recipient_email: Email address to send to
+        recipient_email: Email address or comma-separated addresses to send to
     """
-    from app import create_app
-    flask_app = create_app()
-    
-    with flask_app.app_context():
-        try:
-            from app.utils.email_sender import smtp_gmail_setup
-            
-            email_sender = smtp_gmail_setup()
-            success = email_sender.send_weekly_report(report_data, recipient_email)
+    try:
+        from app.utils.email_sender import smtp_gmail_setup
+        
+        email_sender = smtp_gmail_setup()
+        success = email_sender.send_weekly_report(report_data, recipient_email)
+        
+        if success:
+            logger.info(f"Custom report sent successfully to {recipient_email}")
+            return "Report sent successfully"
+        else:
+            logger.error("Failed to send custom report")
+            return "Failed to send report"
             
-            if success:
-                logger.info(f"Custom report sent successfully to {recipient_email}")
-                return "Report sent successfully"
-            else:
-                logger.error("Failed to send custom report")
-                return "Failed to send report"
-                
-        except Exception as e:
-            logger.error(f"Error sending custom report: {e}")
-            return f"Error sending report: {e}"
+    except Exception as e:
+        logger.error(f"Error sending custom report: {e}")
+        return f"Error sending report: {e}"
+
+
+@celery.task
+def maintain_partitions():
+    """
+    Create the monthly rankings/ranking_changes partitions for upcoming months
+    """
+    from app.utils.partitions import ensure_partitions
+    
+    ensured = ensure_partitions()
+    logger.info(f"Ensured {len(ensured)} partitions")
+    return f"Ensured {len(ensured)} partitions"
 
 
 @celery.task
 def cleanup_old_data():
     """
-    Clean up old ranking data to manage database size
-    Keeps data for the last 365 days
+    Apply the retention policy to ranking history
+    
+    Expired rows are removed with batched set-based DELETEs and older rows
+    are optionally downsampled to weekly points (see Config.RETENTION_DAYS
+    and Config.DOWNSAMPLE_AFTER_DAYS).
     """
-    from app import create_app
-    flask_app = create_app()
+    try:
+        from app.models import db
+        from app.utils.retention import apply_retention
+        from app.utils.cache import invalidate_dashboard_cache
+        
+        summary = apply_retention()
+        invalidate_dashboard_cache()
+        
+        deleted_count = sum(counts['expired'] + counts['downsampled'] for counts in summary.values())
+        logger.info(f"Cleaned up {deleted_count} old records: {summary}")
+        return f"Cleaned up {deleted_count} old records"
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in cleanup_old_data: {e}")
+        return f"Error cleaning up data: {e}"
+
+
+def check_keywords(keywords, api_key, run_id=None):
+    """
+    Fetch and save rankings for a list of keywords
     
-    with flask_app.app_context():
-        try:
-            from app.models import db, Ranking, RankingChange
-            
-            cutoff_date = date.today() - timedelta(days=365)
-            
-            # Delete old rankings
-            old_rankings = Ranking.query.filter(Ranking.check_date < cutoff_date).all()
-            for ranking in old_rankings:
-                db.session.delete(ranking)
-            
-            # Delete old ranking changes
-            old_changes = RankingChange.query.filter(RankingChange.change_date < cutoff_date).all()
-            for change in old_changes:
-                db.session.delete(change)
-            
-            db.session.commit()
-            
-            deleted_count = len(old_rankings) + len(old_changes)
-            logger.info(f"Cleaned up {deleted_count} old records")
-            return f"Cleaned up {deleted_count} old records"
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error in cleanup_old_data: {e}")
-            return f"Error cleaning up data: {e}"
+    Args:
+        keywords: Keyword model instances to check
+        api_key: SerpAPI key
+        run_id: Run ledger ID; keywords already completed in it are not re-fetched
+    
+    Returns:
+        List of result dictionaries, one per keyword
+    """
+    from app.utils.serpapi_client import fetch_keyword_rankings
+    from app.config import Config
+    
+    results = [None] * len(keywords)
+    
+    if run_id:
+        from app.utils.run_ledger import get_completed_results
+        
+        completed = get_completed_results(run_id, [keyword.id for keyword in keywords])
+        for index, keyword in enumerate(keywords):
+            results[index] = completed.get(keyword.id)
+    
+    pending = [(index, keyword) for index, keyword in enumerate(keywords) if results[index] is None]
+    
+    # Fetch all remaining SERPs concurrently
+    fetched = fetch_keyword_rankings(
+        [(keyword.keyword, keyword.domain) for _, keyword in pending],
+        api_key,
+        max_workers=Config.SERPAPI_CONCURRENCY
+    )
+    
+    to_save = []
+    
+    for (index, keyword), (ranking_data, fetch_error) in zip(pending, fetched):
+        if fetch_error:
+            logger.error(f"Error checking keyword {keyword.keyword}: {fetch_error}")
+            results[index] = {
+                'keyword_id': keyword.id,
+                'keyword': keyword.keyword,
+                'error': str(fetch_error)
+            }
+        else:
+            to_save.append((index, keyword, ranking_data))
+    
+    # Save the whole batch in one transaction
+    try:
+        saved = save_ranking_batch(
+            [(keyword.id, ranking_data) for _, keyword, ranking_data in to_save],
+            run_id=run_id
+        )
+        for (index, _, _), ranking_result in zip(to_save, saved):
+            results[index] = ranking_result
+    except Exception:
+        # Fall back to saving one by one so a bad row only fails its own keyword
+        for index, keyword, ranking_data in to_save:
+            try:
+                results[index] = save_ranking_data(keyword.id, ranking_data, run_id=run_id)
+            except Exception as e:
+                logger.error(f"Error checking keyword {keyword.keyword}: {e}")
+                results[index] = {
+                    'keyword_id': keyword.id,
+                    'keyword': keyword.keyword,
+                    'error': str(e)
+                }
+    
+    for index, keyword, ranking_data in to_save:
+        if 'error' not in results[index]:
+            logger.info(f"Checked keyword: {keyword.keyword} - Position: {ranking_data.get('position', 'Not found')}")
+    
+    return results
 
 
-def save_ranking_data(keyword_id, ranking_data):
+def save_ranking_data(keyword_id, ranking_data, run_id=None):
     """
     Save ranking data to database and calculate changes
     
     Args:
         keyword_id: ID of the keyword
         ranking_data: Ranking data from SerpAPI
+        run_id: Run ledger ID to mark the keyword completed in
     
     Returns:
         Dictionary with save result
     """
+    return save_ranking_batch([(keyword_id, ranking_data)], run_id=run_id)[0]
+
+
+def save_ranking_batch(items, run_id=None):
+    """
+    Save ranking data for many keywords in one transaction
+    
+    Previous positions for every keyword are loaded with a single query,
+    change metrics are computed in memory, all rankings, changes and
+    competitor positions are written with bulk upserts and
+    keyword_current_state is upserted.
+    
+    Rankings are unique per keyword and check_date: saving a keyword again
+    on the same day overwrites that day's rows and compares against the
+    last check before today, so re-running a check never duplicates data.
+    
+    Args:
+        items: List of (keyword_id, ranking_data) tuples
+        run_id: Run ledger ID to mark the saved keywords completed in
+    
+    Returns:
+        List of save result dictionaries in the same order as items
+    """
+    from sqlalchemy import func
+    from app.models import db, Ranking, RankingChange, CompetitorPosition
+    from app.utils.current_state import upsert_current_states
+    from app.utils.cache import invalidate_dashboard_cache
+    
+    if not items:
+        return []
+    
     try:
-        from app.models import db, Ranking, RankingChange
-        
-        # Get the latest ranking for comparison
-        latest_ranking = Ranking.query.filter_by(
-            keyword_id=keyword_id
-        ).order_by(Ranking.check_date.desc()).first()
-        
-        # Create new ranking record
-        new_ranking = Ranking(
-            keyword_id=keyword_id,
-            position=ranking_data.get('position'),
-            url=ranking_data.get('url'),
-            title=ranking_data.get('title'),
-            found_in_top_100=ranking_data.get('found_in_top_100', False),
-            serp_features=ranking_data.get('serp_features', {}),
-            check_date=date.today()
+        keyword_ids = {keyword_id for keyword_id, _ in items}
+        check_date = date.today()
+        
+        # Get the latest ranking before today of every keyword for comparison
+        latest = db.session.query(
+            Ranking.keyword_id,
+            Ranking.position,
+            func.row_number().over(
+                partition_by=Ranking.keyword_id,
+                order_by=(Ranking.check_date.desc(), Ranking.id.desc())
+            ).label('row_number')
+        ).filter(
+            Ranking.keyword_id.in_(keyword_ids),
+            Ranking.check_date < check_date
+        ).subquery()
+        
+        previous_positions = dict(
+            db.session.query(latest.c.keyword_id, latest.c.position)
+            .filter(latest.c.row_number == 1)
+            .all()
         )
         
-        db.session.add(new_ranking)
+        # Rows are keyed by their unique columns; a repeated keyword keeps its last entry
+        ranking_rows = {}
+        change_rows = {}
+        competitor_rows = {}
+        state_rows = []
+        results = []
         
-        # Calculate and save ranking change
-        if latest_ranking:
-            change_direction, change_magnitude, position_change = RankingChange.calculate_change_metrics(
-                latest_ranking.position,
-                new_ranking.position
-            )
+        for keyword_id, ranking_data in items:
+            ranking_row = {
+                'keyword_id': keyword_id,
+                'position': ranking_data.get('position'),
+                'url': ranking_data.get('url'),
+                'title': ranking_data.get('title'),
+                'found_in_top_100': ranking_data.get('found_in_top_100', False),
+                'serp_features': ranking_data.get('serp_features', {}),
+                'check_date': check_date
+            }
+            ranking_rows[keyword_id] = ranking_row
+            
+            for domain, competitor in (ranking_data.get('competitors') or {}).items():
+                competitor_rows[(keyword_id, domain)] = {
+                    'keyword_id': keyword_id,
+                    'domain': domain,
+                    'position': competitor.get('position'),
+                    'url': competitor.get('url'),
+                    'check_date': check_date
+                }
             
-            ranking_change = RankingChange(
-                keyword_id=keyword_id,
-                previous_position=latest_ranking.position,
-                current_position=new_ranking.position,
-                position_change=position_change,
-                change_direction=change_direction,
-                change_magnitude=change_magnitude,
-                change_date=date.today()
-            )
+            # Calculate ranking change
+            has_previous = keyword_id in previous_positions
+            previous_position = previous_positions.get(keyword_id)
+            if has_previous:
+                change_direction, change_magnitude, position_change = RankingChange.calculate_change_metrics(
+                    previous_position,
+                    ranking_row['position']
+                )
+                
+                change_rows[keyword_id] = {
+                    'keyword_id': keyword_id,
+                    'previous_position': previous_position,
+                    'current_position': ranking_row['position'],
+                    'position_change': position_change,
+                    'change_direction': change_direction,
+                    'change_magnitude': change_magnitude,
+                    'change_date': check_date
+                }
+            
+            state_rows.append(dict(
+                ranking_row,
+                previous_position=previous_position if has_previous else None,
+                position_change=position_change if has_previous else None,
+                change_direction=change_direction if has_previous else None,
+                change_magnitude=change_magnitude if has_previous else None,
+                change_date=check_date if has_previous else None
+            ))
             
-            db.session.add(ranking_change)
+            results.append({
+                'keyword_id': keyword_id,
+                'keyword': ranking_data.get('keyword'),
+                'domain': ranking_data.get('domain'),
+                'position': ranking_row['position'],
+                'found_in_top_100': ranking_row['found_in_top_100'],
+                'url': ranking_row['url'],
+                'previous_position': previous_position,
+                'change_direction': change_direction if has_previous else 'new',
+                'change_magnitude': change_magnitude if has_previous else 'major',
+                'position_change': position_change if has_previous else None
+            })
         
-        db.session.commit()
+        _upsert_rows(
+            Ranking, list(ranking_rows.values()),
+            ('keyword_id', 'check_date'),
+            ('position', 'url', 'title', 'found_in_top_100', 'serp_features')
+        )
+        _upsert_rows(
+            RankingChange, list(change_rows.values()),
+            ('keyword_id', 'change_date'),
+            ('previous_position', 'current_position', 'position_change', 'change_direction', 'change_magnitude')
+        )
+        _upsert_rows(
+            CompetitorPosition, list(competitor_rows.values()),
+            ('keyword_id', 'check_date', 'domain'),
+            ('position', 'url')
+        )
+        upsert_current_states(state_rows)
         
-        result = {
-            'keyword_id': keyword_id,
-            'keyword': ranking_data.get('keyword'),
-            'position': new_ranking.position,
-            'found_in_top_100': new_ranking.found_in_top_100,
-            'url': new_ranking.url,
-            'previous_position': latest_ranking.position if latest_ranking else None,
-            'change_direction': change_direction if latest_ranking else 'new',
-            'change_magnitude': change_magnitude if latest_ranking else 'major',
-            'position_change': position_change if latest_ranking else None
-        }
+        if run_id:
+            from app.utils.run_ledger import record_completed
+            record_completed(run_id, results)
         
-        return result
+        db.session.commit()
+        invalidate_dashboard_cache()
+        
+        return results
         
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error saving ranking data for keyword {keyword_id}: {e}")
+        logger.error(f"Error saving ranking data for keywords {sorted(keyword_ids)}: {e}")
         raise e
 
 
+def _upsert_rows(model, rows, key_columns, update_columns):
+    """
+    Bulk insert rows, overwriting any existing row with the same key
+    
+    Args:
+        model: Model class to write to
+        rows: Row dictionaries, at most one per key
+        key_columns: Columns of the model's unique constraint
+        update_columns: Columns to overwrite on conflict
+    """
+    from app.models import db, dialect_insert
+    
+    if not rows:
+        return
+    
+    stmt = dialect_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+    db.session.execute(stmt, rows)
+
+
 def prepare_report_data(ranking_results):
     """
     Prepare ranking data for email report
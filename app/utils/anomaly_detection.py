@@ -0,0 +1,134 @@
+import logging
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.utils.trend_analytics import load_history_frame
+
+logger = logging.getLogger(__name__)
+
+# Unranked checks are scored as just outside the top 100, so entering or
+# dropping out of the results counts as a large move
+UNRANKED_POSITION = 101
+
+
+def detect_significant_moves(history: pd.DataFrame,
+                             z_threshold: Optional[float] = None,
+                             span: Optional[int] = None,
+                             min_history: Optional[int] = None,
+                             min_std: Optional[float] = None,
+                             fallback_move: Optional[int] = None) -> pd.DataFrame:
+    """
+    Score each keyword's latest move against its own history, for all keywords at once
+    
+    The latest move (latest position minus the previous one) is divided
+    by an EWMA estimate of the keyword's move volatility taken over the
+    moves before it. Moves with |z| >= z_threshold are flagged. Keywords
+    with fewer than min_history earlier moves fall back to a fixed
+    threshold of fallback_move positions.
+    
+    Args:
+        history: Frame as returned by trend_analytics.load_history_frame
+        z_threshold: Z-score from which a move is significant (defaults to Config.ANOMALY_Z_THRESHOLD)
+        span: EWMA span in checks (defaults to Config.ANOMALY_EWMA_SPAN)
+        min_history: Earlier moves needed for a z-score (defaults to Config.ANOMALY_MIN_HISTORY)
+        min_std: Floor for the volatility estimate in positions (defaults to Config.ANOMALY_MIN_STD)
+        fallback_move: Fixed threshold used without enough history (defaults to Config.ANOMALY_FALLBACK_MOVE)
+    
+    Returns:
+        DataFrame indexed by keyword_id with columns move, volatility,
+        z_score, history and flagged
+    """
+    z_threshold = Config.ANOMALY_Z_THRESHOLD if z_threshold is None else z_threshold
+    span = span or Config.ANOMALY_EWMA_SPAN
+    min_history = Config.ANOMALY_MIN_HISTORY if min_history is None else min_history
+    min_std = Config.ANOMALY_MIN_STD if min_std is None else min_std
+    fallback_move = Config.ANOMALY_FALLBACK_MOVE if fallback_move is None else fallback_move
+    
+    columns = ['move', 'volatility', 'z_score', 'history', 'flagged']
+    if history.empty:
+        return pd.DataFrame(columns=columns).rename_axis('keyword_id')
+    
+    frame = history.sort_values(['keyword_id', 'check_date'], kind='stable')
+    positions = frame['position'].fillna(UNRANKED_POSITION)
+    moves = positions.groupby(frame['keyword_id']).diff()
+    
+    moves_frame = pd.DataFrame({'keyword_id': frame['keyword_id'], 'move': moves}).dropna()
+    is_latest = moves_frame.groupby('keyword_id').cumcount(ascending=False) == 0
+    
+    latest = moves_frame[is_latest].set_index('keyword_id')['move']
+    earlier = moves_frame[~is_latest]
+    
+    # EWMA of squared earlier moves: recent behaviour weighs most
+    squared = (earlier['move'] ** 2).groupby(earlier['keyword_id'])
+    ewm_variance = squared.ewm(span=span).mean().groupby(level=0).last()
+    history_size = squared.size()
+    
+    result = pd.DataFrame({'move': latest})
+    result['history'] = history_size.reindex(result.index, fill_value=0)
+    result['volatility'] = np.sqrt(ewm_variance.reindex(result.index))
+    scale = result['volatility'].clip(lower=min_std)
+    result['z_score'] = (result['move'] / scale).where(result['history'] >= min_history)
+    
+    result['flagged'] = np.where(
+        result['history'] >= min_history,
+        result['z_score'].abs() >= z_threshold,
+        result['move'].abs() >= fallback_move
+    )
+    
+    result.index.name = 'keyword_id'
+    return result[columns]
+
+
+def get_significant_moves(keyword_ids: Optional[Iterable[int]] = None, days: Optional[int] = None) -> Dict[int, Dict]:
+    """
+    Load history and score the latest move of many keywords
+    
+    Args:
+        keyword_ids: Restrict to these keywords (all active keywords if None)
+        days: Length of the history window (defaults to Config.ANOMALY_WINDOW_DAYS)
+    
+    Returns:
+        Dictionary mapping keyword_id to its move, volatility, z_score and flagged
+    """
+    days = Config.ANOMALY_WINDOW_DAYS if days is None else days
+    history = load_history_frame(days, keyword_ids, active_only=keyword_ids is None)
+    scores = detect_significant_moves(history)
+    
+    moves = {}
+    for keyword_id, row in zip(scores.index, scores.to_dict('records')):
+        z_score = row['z_score']
+        volatility = row['volatility']
+        moves[int(keyword_id)] = {
+            'move': int(row['move']),
+            'volatility': None if math.isnan(volatility) else round(float(volatility), 2),
+            'z_score': None if math.isnan(z_score) else round(float(z_score), 2),
+            'flagged': bool(row['flagged'])
+        }
+    return moves
+
+
+def flag_significant_moves(ranking_data: List[Dict]) -> List[Dict]:
+    """
+    Mark ranking entries whose latest move is significant for their keyword
+    
+    Args:
+        ranking_data: Ranking dictionaries with a keyword_id
+    
+    Returns:
+        The same list, each entry updated with 'significant' and 'z_score'
+    """
+    keyword_ids = {item['keyword_id'] for item in ranking_data if item.get('keyword_id') is not None}
+    moves = get_significant_moves(keyword_ids) if keyword_ids else {}
+    
+    for item in ranking_data:
+        move = moves.get(item.get('keyword_id'))
+        item['significant'] = bool(move and move['flagged'])
+        item['z_score'] = move['z_score'] if move else None
+    
+    flagged = sum(1 for item in ranking_data if item['significant'])
+    logger.info(f"Flagged {flagged} of {len(ranking_data)} keywords with significant moves")
+    return ranking_data
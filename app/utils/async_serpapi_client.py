@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.config import Config
+from app.utils.rate_limiter import get_serpapi_rate_limiter
+from app.utils.serp_cache import get_serp_cache, serp_cache_key
+from app.utils.serp_archive import get_serp_archive
+from app.utils.serpapi_client import RETRY_STATUSES, SerpResultsParser, build_ranking_data, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSerpAPIClient(SerpResultsParser):
+    """
+    asyncio client for SerpAPI with the same contract as SerpAPIClient
+    
+    search_google is a coroutine; the SERP parsing helpers are shared
+    with the blocking client. Searches in flight are bounded by a
+    semaphore and their starts by the shared SerpAPI rate budget, so one
+    event loop can keep many searches open without a thread per request.
+    
+    Use as an async context manager (or call aclose()) so the HTTP
+    connection pool is closed with the event loop that opened it.
+    """
+    
+    def __init__(self, api_key: str, concurrency: Optional[int] = None,
+                 semaphore: Optional[asyncio.Semaphore] = None, rate_limiter=None,
+                 serp_cache=None, http_client: Optional[httpx.AsyncClient] = None):
+        self.api_key = api_key
+        self.base_url = "https://serpapi.com/search"
+        self.concurrency = concurrency or Config.SERPAPI_ASYNC_CONCURRENCY
+        # Created on first use: before Python 3.10 a semaphore binds to the
+        # event loop current at construction, which may not be the running one
+        self._semaphore = semaphore
+        self.rate_limiter = rate_limiter or get_serpapi_rate_limiter()
+        self.serp_cache = serp_cache or get_serp_cache()
+        self.serp_archive = get_serp_archive()
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or self._create_http_client()
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Semaphore bounding the searches in flight, created inside the running event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+    
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """
+        Create a keep-alive connection pool sized to the concurrency
+        
+        Returns:
+            AsyncClient reusing connections to serpapi.com across searches
+        """
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        return httpx.AsyncClient(timeout=30, limits=limits)
+    
+    async def __aenter__(self) -> 'AsyncSerpAPIClient':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the connection pool if this client created it"""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+    
+    async def _get(self, params: Dict) -> httpx.Response:
+        """
+        Send one search request, retrying 429/5xx responses and connection errors
+        
+        Every attempt takes a token from the rate budget, so retries never
+        exceed the shared SerpAPI quota.
+        
+        Args:
+            params: SerpAPI query parameters
+        
+        Returns:
+            Last response received
+        """
+        max_retries = Config.SERPAPI_MAX_RETRIES
+        
+        for attempt in range(max_retries + 1):
+            await self.rate_limiter.acquire_async()
+            
+            try:
+                response = await self.http_client.get(self.base_url, params=params)
+            except httpx.TransportError as e:
+                if attempt == max_retries:
+                    raise
+                delay = retry_delay(None, attempt)
+                reason = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    return response
+                delay = retry_delay(response.headers.get('Retry-After'), attempt)
+                reason = f"HTTP {response.status_code}"
+            
+            logger.warning(f"Retrying search for '{params['q']}' in {delay:.1f}s after {reason}")
+            await asyncio.sleep(delay)
+    
+    async def search_google(self, keyword: str, location: str = 'United States') -> Dict:
+        """
+        Search Google for a keyword and return SERP results
+        
+        Args:
+            keyword: The search keyword
+            location: Geographic location for the search
+        
+        Returns:
+            Dict containing search results (empty on failure)
+        """
+        params = self._search_params(keyword, location)
+        
+        # The same search for another domain reuses the SERP fetched today
+        cache_key = serp_cache_key(params)
+        cached = self.serp_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached SERP for keyword: {keyword}")
+            return cached
+        
+        try:
+            async with self.semaphore:
+                logger.info(f"Searching for keyword: {keyword}")
+                response = await self._get(params)
+            response.raise_for_status()
+            
+            serp_results = response.json()
+            if serp_results:
+                self.serp_cache.set(cache_key, serp_results)
+                # Archive writes are file I/O; keep them off the event loop
+                await asyncio.to_thread(self._archive, cache_key, serp_results)
+            return serp_results
+        
+        except httpx.HTTPError as e:
+            logger.error(f"Error searching for keyword '{keyword}': {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"Unexpected error searching for keyword '{keyword}': {e}")
+            return {}
+    
+    async def batch_check_keywords(self, keywords: List[str], target_domain: str) -> List[Dict]:
+        """
+        Check rankings for multiple keywords concurrently
+        
+        Each distinct keyword is searched once; all searches are started
+        together and throttled by the semaphore and the rate budget.
+        
+        Args:
+            keywords: List of keywords to check
+            target_domain: Domain to check rankings for
+        
+        Returns:
+            List of ranking data dictionaries in the same order as keywords
+        """
+        queries = list(dict.fromkeys(keywords))
+        logger.info(f"Checking {len(keywords)} keywords for {target_domain} with {len(queries)} searches")
+        
+        serps = await asyncio.gather(*(self.search_google(keyword) for keyword in queries), return_exceptions=True)
+        serps = dict(zip(queries, serps))
+        
+        results = []
+        for keyword in keywords:
+            try:
+                search_results = serps[keyword]
+                if isinstance(search_results, Exception):
+                    raise search_results
+                results.append(build_ranking_data(self, keyword, target_domain, search_results))
+            
+            except Exception as e:
+                logger.error(f"Error checking keyword '{keyword}': {e}")
+                results.append({
+                    'keyword': keyword,
+                    'domain': target_domain,
+                    'position': None,
+                    'found_in_top_100': False,
+                    'url': None,
+                    'title': None,
+                    'serp_features': {},
+                    'error': str(e)
+                })
+        
+        return results
+
+
+async def batch_check_keywords_async(keywords: List[str], target_domain: str, api_key: str,
+                                     concurrency: Optional[int] = None) -> List[Dict]:
+    """
+    Check rankings for multiple keywords from within an event loop
+    
+    Args:
+        keywords: List of keywords to check
+        target_domain: Domain to check rankings for
+        api_key: SerpAPI key
+        concurrency: Maximum searches in flight (defaults to SERPAPI_ASYNC_CONCURRENCY)
+    
+    Returns:
+        List of ranking data dictionaries
+    """
+    async with AsyncSerpAPIClient(api_key, concurrency=concurrency) as client:
+        return await client.batch_check_keywords(keywords, target_domain)
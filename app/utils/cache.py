@@ -0,0 +1,99 @@
+import json
+import logging
+from typing import Any, Callable, Optional
+
+import redis
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_KEY = 'cache:dashboard'
+
+# Store a freshly built value only if no invalidation happened since the
+# build started, i.e. the key's generation counter is still the one read
+# before building. Otherwise the build may hold pre-invalidation data.
+SET_IF_GENERATION_SCRIPT = """
+local current = redis.call('GET', KEYS[2]) or ''
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+
+def generation_key(key: str) -> str:
+    """Redis key of the counter bumped every time key is invalidated"""
+    return f"{key}:generation"
+
+
+def get_cached(key: str, builder: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+    """
+    Return a JSON-serializable value from Redis, building it on a miss
+    
+    The cache lives in Redis so every web worker shares it. If Redis is
+    unavailable the value is built directly and nothing is cached. A
+    value whose key was invalidated while it was being built is returned
+    but not stored, so a slow build cannot bring back stale data.
+    
+    Args:
+        key: Cache key
+        builder: Function computing the value on a cache miss
+        ttl: Expiry in seconds (defaults to CACHE_TTL)
+        
+    Returns:
+        Cached or freshly built value
+    """
+    from app.utils.redis_client import get_redis_client
+    
+    client = get_redis_client()
+    
+    try:
+        cached, generation = client.mget(key, generation_key(key))
+        if cached is not None:
+            return json.loads(cached)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return builder()
+    
+    value = builder()
+    
+    try:
+        stored = client.register_script(SET_IF_GENERATION_SCRIPT)(
+            keys=[key, generation_key(key)],
+            args=[generation or b'', json.dumps(value), ttl or Config.CACHE_TTL]
+        )
+        if not stored:
+            logger.info(f"Not caching {key}: invalidated while it was built")
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+    
+    return value
+
+
+def invalidate(*keys: str):
+    """
+    Drop cached values so the next read rebuilds them
+    
+    Each key's generation is bumped as well, so builds already running
+    do not write their result back.
+    
+    Args:
+        keys: Cache keys to delete
+    """
+    from app.utils.redis_client import get_redis_client
+    
+    try:
+        pipeline = get_redis_client().pipeline()
+        for key in keys:
+            pipeline.incr(generation_key(key))
+        pipeline.delete(*keys)
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed for {keys}: {e}")
+
+
+def invalidate_dashboard_cache():
+    """Drop the cached dashboard payload after rankings or keywords change"""
+    invalidate(DASHBOARD_CACHE_KEY)
@@ -0,0 +1,187 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models import db, dialect_insert, Keyword, KeywordCurrentState
+
+logger = logging.getLogger(__name__)
+
+API_FIELDS = {
+    'keyword_id': Keyword.id,
+    'keyword': Keyword.keyword,
+    'domain': Keyword.domain,
+    'position': KeywordCurrentState.position,
+    'url': KeywordCurrentState.url,
+    'title': KeywordCurrentState.title,
+    'found_in_top_100': KeywordCurrentState.found_in_top_100,
+    'check_date': KeywordCurrentState.check_date,
+    'serp_features': KeywordCurrentState.serp_features,
+    'previous_position': KeywordCurrentState.previous_position,
+    'position_change': KeywordCurrentState.position_change,
+    'change_direction': KeywordCurrentState.change_direction,
+    'change_magnitude': KeywordCurrentState.change_magnitude
+}
+
+DEFAULT_API_FIELDS = (
+    'keyword_id', 'keyword', 'domain', 'position', 'url', 'title',
+    'found_in_top_100', 'check_date', 'serp_features'
+)
+
+STATE_COLUMNS = (
+    'position', 'url', 'title', 'found_in_top_100', 'serp_features', 'check_date',
+    'previous_position', 'position_change', 'change_direction', 'change_magnitude', 'change_date'
+)
+
+
+def upsert_current_states(rows: List[Dict]):
+    """
+    Insert or update the current state row of each keyword
+    
+    Runs inside the caller's transaction; the caller commits.
+    
+    Args:
+        rows: State dictionaries keyed by keyword_id plus STATE_COLUMNS
+    """
+    if not rows:
+        return
+    
+    # Keep only the last row per keyword so one statement never hits a row twice
+    by_keyword = {row['keyword_id']: row for row in rows}
+    now = datetime.utcnow()
+    values = [dict(row, updated_at=now) for row in by_keyword.values()]
+    
+    stmt = dialect_insert(KeywordCurrentState)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[KeywordCurrentState.keyword_id],
+        set_={column: stmt.excluded[column] for column in STATE_COLUMNS + ('updated_at',)}
+    )
+    db.session.execute(stmt, values)
+
+
+def rebuild_current_states() -> int:
+    """
+    Regenerate keyword_current_state from the full ranking history
+    
+    Returns:
+        Number of state rows written
+    """
+    from app.utils.ranking_queries import get_latest_keyword_states
+    
+    try:
+        states = get_latest_keyword_states(active_only=False, ranked_only=True)
+        
+        rows = []
+        for state in states:
+            row = {'keyword_id': state.keyword_id}
+            for column in STATE_COLUMNS:
+                row[column] = getattr(state, column, None)
+            rows.append(row)
+        
+        db.session.query(KeywordCurrentState).delete()
+        if rows:
+            db.session.execute(
+                dialect_insert(KeywordCurrentState),
+                [dict(row, updated_at=datetime.utcnow()) for row in rows]
+            )
+        db.session.commit()
+        
+        from app.utils.cache import invalidate_dashboard_cache
+        invalidate_dashboard_cache()
+        
+        logger.info(f"Rebuilt current state for {len(rows)} keywords")
+        return len(rows)
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error rebuilding current state: {e}")
+        raise e
+
+
+def get_current_states(active_only: bool = True, ranked_only: bool = False) -> List:
+    """
+    Get every keyword with its stored current state
+    
+    Reads one small row per keyword regardless of how much ranking
+    history has built up.
+    
+    Args:
+        active_only: Only include active keywords
+        ranked_only: Skip keywords that have never been checked
+        
+    Returns:
+        List of rows with keyword and current state columns
+    """
+    query = db.session.query(
+        Keyword.id.label('keyword_id'),
+        Keyword.keyword,
+        Keyword.domain,
+        *[getattr(KeywordCurrentState, column) for column in STATE_COLUMNS]
+    )
+    
+    if ranked_only:
+        query = query.join(KeywordCurrentState, KeywordCurrentState.keyword_id == Keyword.id)
+    else:
+        query = query.outerjoin(KeywordCurrentState, KeywordCurrentState.keyword_id == Keyword.id)
+    
+    if active_only:
+        query = query.filter(Keyword.is_active.is_(True))
+    
+    return query.order_by(Keyword.id).all()
+
+
+def get_current_states_page(fields: Iterable[str] = DEFAULT_API_FIELDS,
+                            after_keyword_id: Optional[int] = None,
+                            limit: int = 100,
+                            domain: Optional[str] = None,
+                            min_position: Optional[int] = None,
+                            max_position: Optional[int] = None,
+                            direction: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Get one keyset-paginated page of ranked keywords' current state
+    
+    Filtering, projection and paging all happen in SQL; pages are ordered
+    by keyword ID and continue after the last ID of the previous page.
+    
+    Args:
+        fields: Names from API_FIELDS to return
+        after_keyword_id: Cursor from the previous page (optional)
+        limit: Maximum rows in the page
+        domain: Only keywords tracked for this domain
+        min_position: Only positions at or below this rank number
+        max_position: Only positions at or above this rank number
+        direction: Only this change direction ('up', 'down', 'new', 'lost', 'same')
+        
+    Returns:
+        Tuple of (rows as dictionaries, cursor for the next page or None)
+    """
+    fields = list(fields)
+    columns = [API_FIELDS[field].label(field) for field in fields]
+    
+    query = db.session.query(Keyword.id.label('_cursor'), *columns).join(
+        KeywordCurrentState, KeywordCurrentState.keyword_id == Keyword.id
+    ).filter(Keyword.is_active.is_(True))
+    
+    if after_keyword_id is not None:
+        query = query.filter(Keyword.id > after_keyword_id)
+    if domain:
+        query = query.filter(Keyword.domain == domain)
+    if min_position is not None:
+        query = query.filter(KeywordCurrentState.position >= min_position)
+    if max_position is not None:
+        query = query.filter(KeywordCurrentState.position <= max_position)
+    if direction:
+        query = query.filter(KeywordCurrentState.change_direction == direction)
+    
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Keyword.id).limit(limit + 1).all()
+    
+    next_cursor = rows[limit - 1]._cursor if len(rows) > limit else None
+    
+    page = []
+    for row in rows[:limit]:
+        item = {field: getattr(row, field) for field in fields}
+        if item.get('check_date') is not None:
+            item['check_date'] = item['check_date'].isoformat()
+        page.append(item)
+    
+    return page, next_cursor
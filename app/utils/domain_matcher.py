@@ -0,0 +1,129 @@
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=65536)
+def normalize_host(url_or_domain: str) -> str:
+    """
+    Normalize a URL or domain to a bare lowercase host
+    
+    Strips scheme, credentials, port, path, trailing dot and a leading
+    'www.'. Results are memoized since the same hosts recur across SERPs.
+    
+    Args:
+        url_or_domain: URL or domain to normalize
+        
+    Returns:
+        Normalized host, or an empty string
+    """
+    if not url_or_domain:
+        return ""
+    
+    value = url_or_domain.strip().lower()
+    if '://' not in value:
+        value = '//' + value
+    
+    try:
+        host = urlsplit(value).hostname or ''
+    except ValueError:
+        return ""
+    
+    host = host.rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+def host_suffixes(host: str) -> List[str]:
+    """Return a host and each of its parent domains, most specific first"""
+    labels = host.split('.')
+    return ['.'.join(labels[start:]) for start in range(len(labels))]
+
+
+class DomainMatcher:
+    """
+    Match result URLs against a set of target domains
+    
+    Targets are normalized once. A URL matches a target when its host is
+    the target itself or a subdomain of it, checked with one set lookup
+    per host label, so 'example.com' matches 'shop.example.com' but never
+    'notexample.com' or 'example.com.evil'.
+    """
+    
+    # Hosts remembered per matcher before the memo is reset
+    MAX_MEMO_SIZE = 65536
+    
+    def __init__(self, targets: Iterable[str]):
+        self.targets: Dict[str, str] = {}
+        for target in targets:
+            host = normalize_host(target)
+            if host:
+                self.targets.setdefault(host, target)
+        self._memo: Dict[str, Optional[str]] = {}
+    
+    def match(self, url: str) -> Optional[str]:
+        """
+        Return the target domain a URL belongs to
+        
+        Args:
+            url: Result URL or host
+            
+        Returns:
+            The original target string, or None if no target matches
+        """
+        host = normalize_host(url)
+        if not host:
+            return None
+        
+        if host in self._memo:
+            return self._memo[host]
+        
+        matched = None
+        for suffix in host_suffixes(host):
+            matched = self.targets.get(suffix)
+            if matched is not None:
+                break
+        
+        if len(self._memo) >= self.MAX_MEMO_SIZE:
+            self._memo.clear()
+        self._memo[host] = matched
+        return matched
+    
+    def first_positions(self, organic_results: List[Dict]) -> Dict[str, Tuple[int, Dict]]:
+        """
+        Find the first position of every target in one pass over the results
+        
+        Args:
+            organic_results: SerpAPI organic results in rank order
+            
+        Returns:
+            Dict mapping each found target to (position, result_dict)
+        """
+        found: Dict[str, Tuple[int, Dict]] = {}
+        
+        for i, result in enumerate(organic_results, 1):
+            target = self.match(result.get('link', ''))
+            if target is not None and target not in found:
+                found[target] = (i, result)
+                if len(found) == len(self.targets):
+                    break
+        
+        return found
+
+
+@lru_cache(maxsize=1024)
+def get_domain_matcher(targets: Tuple[str, ...]) -> DomainMatcher:
+    """
+    Return a compiled matcher for a tuple of target domains
+    
+    Args:
+        targets: Target domains
+        
+    Returns:
+        Shared DomainMatcher instance
+    """
+    return DomainMatcher(targets)
@@ -1,16 +1,40 @@
 import smtplib
+import time
 import logging
 import email.mime.text
 import email.mime.multipart
 import email.mime.base
 import email.encoders
-from typing import Dict, List, Optional
-from jinja2 import Template
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Union
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
 
+def parse_recipients(recipients: Union[str, Iterable[str], None]) -> List[str]:
+    """
+    Normalize a recipient or comma-separated recipient list
+    
+    Args:
+        recipients: Email address, comma-separated addresses or a list
+        
+    Returns:
+        List of unique addresses in their original order
+    """
+    if not recipients:
+        return []
+    if isinstance(recipients, str):
+        recipients = recipients.split(',')
+    
+    parsed = []
+    for recipient in recipients:
+        recipient = recipient.strip()
+        if recipient and recipient not in parsed:
+            parsed.append(recipient)
+    return parsed
+
+
 class EmailSender:
     """Handle email sending functionality"""
     
@@ -19,6 +43,127 @@ class EmailSender:
         self.gmail_password = gmail_password
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
+        self._server = None
+        self._in_session = False
+    
+    def _connect(self) -> smtplib.SMTP:
+        """Open an authenticated SMTP session"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        server.starttls()
+        server.login(self.gmail_user, self.gmail_password)
+        return server
+    
+    def _disconnect(self):
+        """Close the open SMTP session, ignoring errors from a dead connection"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+    
+    @contextmanager
+    def connection(self):
+        """
+        Keep one authenticated SMTP session open for every send in the block
+        
+        Nested uses share the outer session. The connection is opened
+        lazily by the first send, so connect errors are retried per recipient.
+        """
+        if self._in_session:
+            yield self
+            return
+        
+        self._in_session = True
+        try:
+            yield self
+        finally:
+            self._in_session = False
+            self._disconnect()
+    
+    def _build_message(self, to_email: str, subject: str, html_body: str,
+                       text_body: Optional[str] = None) -> email.mime.multipart.MIMEMultipart:
+        """Build a multipart message for one recipient"""
+        msg = email.mime.multipart.MIMEMultipart('alternative')
+        msg['From'] = f"{Config.EMAIL_CONFIG['sender_name']} <{self.gmail_user}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Add text part if provided
+        if text_body:
+            text_part = email.mime.text.MIMEText(text_body, 'plain')
+            msg.attach(text_part)
+        
+        # Add HTML part
+        html_part = email.mime.text.MIMEText(html_body, 'html')
+        msg.attach(html_part)
+        
+        return msg
+    
+    def send_bulk(self, recipients: Union[str, Iterable[str]], subject: str, html_body: str,
+                  text_body: Optional[str] = None) -> Dict[str, bool]:
+        """
+        Send the same email to many recipients over one SMTP session
+        
+        Connection errors and transient (4xx) responses are retried
+        SMTP_MAX_RETRIES times per recipient with exponential backoff,
+        reconnecting if the server dropped the session. Permanent (5xx)
+        responses are not retried, and an authentication failure aborts
+        the whole batch since no recipient can succeed.
+        
+        Args:
+            recipients: Recipient address(es)
+            subject: Email subject
+            html_body: HTML content of the email
+            text_body: Plain text fallback (optional)
+            
+        Returns:
+            Dict mapping each recipient to whether it was delivered
+        """
+        recipients = parse_recipients(recipients)
+        delivered = {to_email: False for to_email in recipients}
+        
+        with self.connection():
+            for to_email in recipients:
+                msg = self._build_message(to_email, subject, html_body, text_body)
+                
+                for attempt in range(Config.SMTP_MAX_RETRIES + 1):
+                    try:
+                        if self._server is None:
+                            self._server = self._connect()
+                        self._server.send_message(msg)
+                        delivered[to_email] = True
+                        logger.info(f"Email sent successfully to {to_email}")
+                        break
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Permanent rejection of this address, retrying will not help
+                        logger.error(f"Failed to send email to {to_email}: {e}")
+                        break
+                    except smtplib.SMTPAuthenticationError as e:
+                        # Bad credentials fail every recipient alike
+                        logger.error(f"SMTP authentication failed, aborting {len(recipients)} emails: {e}")
+                        self._disconnect()
+                        return delivered
+                    except OSError as e:
+                        # smtplib errors are OSErrors; only a dropped session needs a reconnect
+                        is_connection_error = (isinstance(e, smtplib.SMTPServerDisconnected)
+                                               or not isinstance(e, smtplib.SMTPException))
+                        if is_connection_error:
+                            self._disconnect()
+                        
+                        # Only connection errors and 4xx responses are transient
+                        is_transient = is_connection_error or (
+                            isinstance(e, smtplib.SMTPResponseException) and 400 <= e.smtp_code < 500
+                        )
+                        if not is_transient or attempt >= Config.SMTP_MAX_RETRIES:
+                            logger.error(f"Failed to send email to {to_email}: {e}")
+                            break
+                        delay = Config.SMTP_RETRY_BACKOFF * (2 ** attempt)
+                        logger.warning(f"Retrying email to {to_email} in {delay}s: {e}")
+                        time.sleep(delay)
+        
+        return delivered
     
     def send_email(self, to_email: str, subject: str, html_body: str, text_body: Optional[str] = None) -> bool:
         """
@@ -34,57 +179,51 @@ class EmailSender:
             Boolean indicating success
         """
         try:
-            # Create message
-            msg = email.mime.multipart.MIMEMultipart('alternative')
-            msg['From'] = f"{Config.EMAIL_CONFIG['sender_name']} <{self.gmail_user}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add text part if provided
-            if text_body:
-                text_part = email.mime.text.MIMEText(text_body, 'plain')
-                msg.attach(text_part)
-            
-            # Add HTML part
-            html_part = email.mime.text.MIMEText(html_body, 'html')
-            msg.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.gmail_user, self.gmail_password)
-                server.send_message(msg)
-            
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
+            delivered = self.send_bulk([to_email], subject, html_body, text_body)
+            return all(delivered.values()) and bool(delivered)
             
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {e}")
             return False
     
-    def send_weekly_report(self, ranking_data: List[Dict], recipient: str) -> bool:
+    def send_weekly_report(self, ranking_data: List[Dict], recipients: Union[str, Iterable[str]],
+                           stats: Optional[Dict] = None, domain: Optional[str] = None,
+                           rollups: Optional[List[Dict]] = None) -> bool:
         """
         Send weekly ranking report
         
+        The report is rendered once and delivered to every recipient over
+        one SMTP session.
+        
         Args:
             ranking_data: List of ranking data dictionaries
-            recipient: Recipient email address
+            recipients: Recipient address(es)
+            stats: Precomputed report statistics (optional)
+            domain: Domain named in the subject of a per-domain report (optional)
+            rollups: Weekly rollup rows for the long-range trend section (optional)
             
         Returns:
-            Boolean indicating success
+            Boolean indicating every recipient was reached
         """
-        from app.utils.report_generator import generate_weekly_report_html
+        from app.utils.report_generator import generate_weekly_report_html, calculate_report_statistics
+        
+        if stats is None:
+            stats = calculate_report_statistics(ranking_data)
         
         # Generate report content
-        html_content = generate_weekly_report_html(ranking_data)
+        html_content = generate_weekly_report_html(ranking_data, stats=stats, rollups=rollups)
         
         # Create subject with summary
-        improvements = sum(1 for item in ranking_data if item.get('change_direction') == 'up')
-        declines = sum(1 for item in ranking_data if item.get('change_direction') == 'down')
+        title = f"Weekly SEO Report ({domain})" if domain else "Weekly SEO Report"
+        subject = f"{title} - {stats['improvements']} Improvements, {stats['declines']} Declines"
         
-        subject = f"Weekly SEO Report - {improvements} Improvements, {declines} Declines"
-        
-        return self.send_email(recipient, subject, html_content)
+        try:
+            delivered = self.send_bulk(recipients, subject, html_content)
+            return bool(delivered) and all(delivered.values())
+            
+        except Exception as e:
+            logger.error(f"Failed to send weekly report: {e}")
+            return False
 
 def smtp_gmail_setup() -> EmailSender:
     """
@@ -101,4 +240,4 @@ def smtp_gmail_setup() -> EmailSender:
     if not gmail_user or not gmail_password:
         raise ValueError("Gmail credentials not configured")
     
-    return EmailSender(gmail_user, gmail_password, smtp_server, smtp_port)
\ No newline at end of file
+    return EmailSender(gmail_user, gmail_password, smtp_server, smtp_port)
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.models import db, Keyword, Ranking, RankingChange
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = {
+    'rankings': (Ranking, Ranking.check_date, (
+        'id', 'keyword_id', 'position', 'url', 'title', 'found_in_top_100',
+        'serp_features', 'check_date', 'created_at'
+    )),
+    'changes': (RankingChange, RankingChange.change_date, (
+        'id', 'keyword_id', 'previous_position', 'current_position', 'position_change',
+        'change_direction', 'change_magnitude', 'change_date', 'created_at'
+    ))
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH_SIZE = 1000
+
+
+def export_columns(table: str):
+    """Return the exported column names of a table, keyword text included"""
+    return EXPORT_TABLES[table][2] + ('keyword', 'domain')
+
+
+def iter_history_rows(table: str, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      keyword_ids: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+    """
+    Stream history rows through a server-side cursor
+    
+    Rows are fetched STREAM_BATCH_SIZE at a time, so memory stays constant
+    no matter how many rows match.
+    
+    Args:
+        table: 'rankings' or 'changes'
+        start_date: First date to include (optional)
+        end_date: Last date to include (optional)
+        keyword_ids: Only export these keywords (optional)
+        
+    Yields:
+        Row mappings with the exported columns
+    """
+    model, date_column, columns = EXPORT_TABLES[table]
+    
+    stmt = select(
+        *[getattr(model, column) for column in columns],
+        Keyword.keyword,
+        Keyword.domain
+    ).join(Keyword, Keyword.id == model.keyword_id)
+    
+    if start_date:
+        stmt = stmt.where(date_column >= start_date)
+    if end_date:
+        stmt = stmt.where(date_column <= end_date)
+    if keyword_ids is not None:
+        stmt = stmt.where(model.keyword_id.in_(list(keyword_ids)))
+    
+    stmt = stmt.order_by(date_column, model.id).execution_options(
+        stream_results=True,
+        yield_per=STREAM_BATCH_SIZE
+    )
+    
+    for row in db.session.execute(stmt).mappings():
+        yield row
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iter_ndjson(rows: Iterable[Dict], columns) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON, one chunk per batch"""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps({column: row[column] for column in columns},
+                                 default=_json_default, ensure_ascii=False))
+        if len(buffer) >= STREAM_BATCH_SIZE:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def iter_csv(rows: Iterable[Dict], columns) -> Iterator[str]:
+    """Encode rows as CSV with a header line, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    count = 0
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row[column]
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            elif isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        writer.writerow(values)
+        
+        count += 1
+        if count % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+
+def generate_export(table: str, export_format: str, start_date: Optional[date] = None,
+                    end_date: Optional[date] = None, keyword_ids: Optional[Iterable[int]] = None) -> Iterator[str]:
+    """
+    Generate an export of ranking history as text chunks
+    
+    Args:
+        table: 'rankings' or 'changes'
+        export_format: 'ndjson' or 'csv'
+        start_date: First date to include (optional)
+        end_date: Last date to include (optional)
+        keyword_ids: Only export these keywords (optional)
+        
+    Returns:
+        Generator of encoded text chunks
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    
+    rows = iter_history_rows(table, start_date, end_date, keyword_ids)
+    columns = export_columns(table)
+    
+    if export_format == 'csv':
+        return iter_csv(rows, columns)
+    return iter_ndjson(rows, columns)
@@ -0,0 +1,192 @@
+import logging
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.config import Config
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month in migrations/init.sql, with their partition key
+PARTITIONED_TABLES = {
+    'rankings': 'check_date',
+    'ranking_changes': 'change_date'
+}
+
+PARTITION_NAME_PATTERN = re.compile(r'^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$')
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """
+    Return the first day of the month containing day, shifted by offset months
+    
+    Args:
+        day: Any date in the month
+        offset: Number of months to move forward (negative moves back)
+    
+    Returns:
+        First day of the resulting month
+    """
+    month_index = day.year * 12 + day.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Return the name of the partition of table holding the given month"""
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(table: str) -> bool:
+    """
+    Check whether table is a partitioned table in the connected database
+    
+    Returns:
+        False on databases other than PostgreSQL or for plain tables
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    
+    return db.session.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {'table': table}
+    ).first() is not None
+
+
+def list_partitions(table: str) -> List[Tuple[str, date]]:
+    """
+    List the monthly partitions of a table
+    
+    Args:
+        table: Partitioned parent table
+    
+    Returns:
+        (partition name, first day of its month) tuples, oldest first;
+        the default partition is not included
+    """
+    names = db.session.execute(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:table)"),
+        {'table': table}
+    ).scalars()
+    
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match and match.group('table') == table:
+            partitions.append((name, date(int(match.group('year')), int(match.group('month')), 1)))
+    
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def partition_exists(name: str) -> bool:
+    """Check whether a table with the given name exists in the connected database"""
+    return db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None
+
+
+def create_partition(table: str, start: date, end: date) -> str:
+    """
+    Create the partition of table for [start, end), moving in rows parked in the default partition
+    
+    PostgreSQL refuses to create a partition while the default partition
+    holds rows in its range. Those rows are moved over in one transaction:
+    the default partition is detached, the monthly partition created, the
+    rows copied through the parent and deleted from the default partition,
+    which is then re-attached.
+    
+    Args:
+        table: Partitioned parent table
+        start: First day of the month
+        end: First day of the next month
+    
+    Returns:
+        Name of the partition
+    """
+    name = partition_name(table, start)
+    default = f"{table}_default"
+    key = PARTITIONED_TABLES[table]
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f"{key} >= '{start.isoformat()}' AND {key} < '{end.isoformat()}'"
+    
+    parked = partition_exists(default) and db.session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")
+    ).scalar()
+    
+    if parked:
+        logger.warning(f"Moving rows for {start:%Y-%m} out of {default} into {name}")
+        db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        db.session.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+        db.session.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}"))
+        db.session.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+        db.session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    else:
+        db.session.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+    
+    return name
+
+
+def ensure_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create missing monthly partitions from the current month onward
+    
+    A no-op on databases where the tables are not partitioned.
+    
+    Args:
+        months_ahead: Months after the current one to create (defaults to Config.PARTITION_MONTHS_AHEAD)
+    
+    Returns:
+        Names of the partitions that were checked or created
+    
+    Raises:
+        Exception: If a partition could not be created
+    """
+    months_ahead = Config.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    this_month = month_start(date.today())
+    ensured = []
+    
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        
+        for offset in range(months_ahead + 1):
+            start = month_start(this_month, offset)
+            name = partition_name(table, start)
+            try:
+                if not partition_exists(name):
+                    create_partition(table, start, month_start(this_month, offset + 1))
+                    logger.info(f"Created partition {name}")
+                db.session.commit()
+                ensured.append(name)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Could not create partition {name}: {e}")
+                raise e
+    
+    return ensured
+
+
+def drop_expired_partitions(table: str, cutoff: date) -> int:
+    """
+    Drop the monthly partitions of table that lie entirely before cutoff
+    
+    Args:
+        table: Partitioned parent table
+        cutoff: Rows before this date are expired
+    
+    Returns:
+        Number of partitions dropped
+    """
+    dropped = 0
+    
+    for name, start in list_partitions(table):
+        if month_start(start, 1) > cutoff:
+            break
+        
+        db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.session.commit()
+        dropped += 1
+        logger.info(f"Dropped expired partition {name}")
+    
+    return dropped
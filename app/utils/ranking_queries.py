@@ -0,0 +1,86 @@
+import logging
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func
+
+from app.models import db, Keyword, Ranking, RankingChange
+
+logger = logging.getLogger(__name__)
+
+
+def get_latest_keyword_states(active_only: bool = True,
+                              keyword_ids: Optional[Iterable[int]] = None,
+                              ranked_only: bool = False) -> List:
+    """
+    Get every keyword with its latest ranking and latest change in one query
+    
+    The latest row per keyword is picked with ROW_NUMBER() windows over
+    rankings and ranking_changes, so the cost is one query no matter how
+    many keywords are tracked.
+    
+    Args:
+        active_only: Only include active keywords
+        keyword_ids: Restrict to these keyword IDs (optional)
+        ranked_only: Skip keywords that have never been checked
+        
+    Returns:
+        List of rows with keyword, latest ranking and latest change columns
+    """
+    latest_ranking = db.session.query(
+        Ranking.keyword_id,
+        Ranking.position,
+        Ranking.url,
+        Ranking.title,
+        Ranking.found_in_top_100,
+        Ranking.serp_features,
+        Ranking.check_date,
+        func.row_number().over(
+            partition_by=Ranking.keyword_id,
+            order_by=(Ranking.check_date.desc(), Ranking.id.desc())
+        ).label('row_number')
+    ).subquery()
+    
+    latest_change = db.session.query(
+        RankingChange.keyword_id,
+        RankingChange.previous_position,
+        RankingChange.position_change,
+        RankingChange.change_direction,
+        RankingChange.change_magnitude,
+        RankingChange.change_date,
+        func.row_number().over(
+            partition_by=RankingChange.keyword_id,
+            order_by=(RankingChange.change_date.desc(), RankingChange.id.desc())
+        ).label('row_number')
+    ).subquery()
+    
+    query = db.session.query(
+        Keyword.id.label('keyword_id'),
+        Keyword.keyword,
+        Keyword.domain,
+        latest_ranking.c.position,
+        latest_ranking.c.url,
+        latest_ranking.c.title,
+        latest_ranking.c.found_in_top_100,
+        latest_ranking.c.serp_features,
+        latest_ranking.c.check_date,
+        latest_change.c.previous_position,
+        latest_change.c.position_change,
+        latest_change.c.change_direction,
+        latest_change.c.change_magnitude,
+        latest_change.c.change_date
+    ).outerjoin(
+        latest_ranking,
+        (latest_ranking.c.keyword_id == Keyword.id) & (latest_ranking.c.row_number == 1)
+    ).outerjoin(
+        latest_change,
+        (latest_change.c.keyword_id == Keyword.id) & (latest_change.c.row_number == 1)
+    )
+    
+    if active_only:
+        query = query.filter(Keyword.is_active.is_(True))
+    if keyword_ids is not None:
+        query = query.filter(Keyword.id.in_(list(keyword_ids)))
+    if ranked_only:
+        query = query.filter(latest_ranking.c.check_date.isnot(None))
+    
+    return query.order_by(Keyword.id).all()
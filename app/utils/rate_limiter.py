@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+import logging
+from typing import Optional
+
+import redis
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing request starts by a fixed interval"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def reserve(self) -> float:
+        """
+        Reserve the next slot and return the seconds to wait for it
+
+        Slots are reserved under the lock and waited for outside of it,
+        so concurrent callers queue up without holding each other up.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+
+        return slot - now
+
+    def acquire(self):
+        """Block until the caller may start its next request"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until the caller may start its next request"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Refill the bucket for the time elapsed since the last call, then take one
+# token. The balance may go negative: that reserves a future token and the
+# caller is told how long to wait for it, so no client ever has to poll.
+TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local state = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+tokens = tokens - 1
+
+redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', key, math.ceil((capacity - tokens) / rate * 1000) + 1000)
+
+if tokens >= 0 then
+    return 0
+end
+return math.ceil(-tokens / rate * 1000)
+"""
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket shared by every process through Redis
+    
+    Each acquire() takes one token from a bucket that refills at `rate`
+    tokens per second up to `capacity`, and sleeps only as long as needed
+    for its token. If Redis is unreachable the limiter falls back to a
+    local RateLimiter so checks keep running at a safe pace.
+    """
+
+    def __init__(self, redis_client: redis.Redis, key: str, rate: float, capacity: int):
+        self.redis = redis_client
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._fallback = RateLimiter(1.0 / rate)
+
+    def reserve(self) -> float:
+        """
+        Take one token and return the seconds to wait before using it
+        
+        Returns:
+            Seconds until the reserved token becomes available
+        """
+        wait_ms = self._script(keys=[self.key], args=[self.rate, self.capacity])
+        return int(wait_ms) / 1000.0
+
+    def acquire(self):
+        """Block until the caller may start its next request"""
+        try:
+            wait = self.reserve()
+        except redis.RedisError as e:
+            logger.warning(f"Rate limiter Redis unavailable, using local limit: {e}")
+            self._fallback.acquire()
+            return
+        
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """
+        Wait without blocking the event loop until the caller may start its next request
+        
+        The blocking Redis round-trip of reserve() runs in a worker thread
+        and the wait is awaited, so one event loop can queue many searches
+        on the budget without stalling.
+        """
+        try:
+            wait = await asyncio.to_thread(self.reserve)
+        except redis.RedisError as e:
+            logger.warning(f"Rate limiter Redis unavailable, using local limit: {e}")
+            await self._fallback.acquire_async()
+            return
+        
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_serpapi_limiter: Optional[TokenBucketRateLimiter] = None
+_serpapi_limiter_lock = threading.Lock()
+
+
+def get_serpapi_rate_limiter() -> TokenBucketRateLimiter:
+    """
+    Return the process-wide limiter drawing from the global SerpAPI quota
+    
+    Returns:
+        TokenBucketRateLimiter shared by all SerpAPI clients
+    """
+    global _serpapi_limiter
+    
+    if _serpapi_limiter is None:
+        with _serpapi_limiter_lock:
+            if _serpapi_limiter is None:
+                from app.utils.redis_client import get_redis_client
+                _serpapi_limiter = TokenBucketRateLimiter(
+                    get_redis_client(),
+                    key='rate_limit:serpapi',
+                    rate=1.0 / Config.SERPAPI_RATE_LIMIT,
+                    capacity=Config.SERPAPI_RATE_BURST
+                )
+    
+    return _serpapi_limiter
@@ -0,0 +1,32 @@
+import logging
+import threading
+from typing import Optional
+
+import redis
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    Return the process-wide Redis client for REDIS_URL
+    
+    The client owns a connection pool, so it is created once and shared
+    between threads and callers in the same process.
+    
+    Returns:
+        Redis client instance
+    """
+    global _client
+    
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=5, socket_connect_timeout=2)
+    
+    return _client
@@ -1,48 +1,148 @@
 from typing import Dict, List, Optional
 from datetime import datetime, date, timedelta
 import logging
-from jinja2 import Template
+import os
+import tempfile
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+EMAIL_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'email_templates')
 
-def generate_weekly_report_html(ranking_data: List[Dict]) -> str:
+_report_env: Optional[Environment] = None
+
+
+def get_report_environment() -> Environment:
+    """
+    Return the shared Jinja environment for email reports
+    
+    Templates are compiled once per process and their bytecode is cached
+    on disk, so rendering a report only executes the template.
+    
+    Returns:
+        Jinja Environment with the report filters registered
+    """
+    global _report_env
+    
+    if _report_env is None:
+        cache_dir = Config.TEMPLATE_CACHE_DIR or os.path.join(tempfile.gettempdir(), 'seo_tracker_jinja')
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        env = Environment(
+            loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            auto_reload=Config.TEMPLATE_AUTO_RELOAD
+        )
+        env.filters['change_class'] = get_change_class
+        env.filters['change_icon'] = get_change_icon
+        env.filters['format_position'] = format_position
+        env.filters['trend_icon'] = get_trend_icon
+        _report_env = env
+    
+    return _report_env
+
+
+def generate_weekly_report_html(ranking_data: List[Dict], stats: Optional[Dict] = None,
+                                rollups: Optional[List[Dict]] = None) -> str:
     """
     Generate HTML report for weekly ranking data
     
+    Statistics cover every keyword; the detailed table lists only entries
+    flagged as significant by anomaly detection. If no entry was scored
+    (e.g. detection failed) the table falls back to every keyword.
+    
     Args:
         ranking_data: List of ranking data with changes
+        stats: Precomputed statistics for ranking_data (optional)
+        rollups: Weekly rollup rows for the long-range trend section (optional)
         
     Returns:
         HTML string for email report
     """
     
     # Calculate summary statistics
-    stats = calculate_report_statistics(ranking_data)
+    if stats is None:
+        stats = calculate_report_statistics(ranking_data)
     
     # Sort data for better presentation
     sorted_data = sort_ranking_data_for_report(ranking_data)
     
-    # Load and render template
-    import os
-    template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'email_templates', 'weekly_report.html')
-    with open(template_path, 'r') as f:
-        template_content = f.read()
+    if any('significant' in item for item in ranking_data):
+        significant_moves = [item for item in sorted_data if item.get('significant') is True]
+    else:
+        # Nothing was scored, so there is no basis for filtering
+        significant_moves = None
     
-    template = Template(template_content)
+    # Render the precompiled template
+    template = get_report_environment().get_template('weekly_report.html')
     
     html_content = template.render(
         report_date=datetime.now().strftime('%B %d, %Y'),
         stats=stats,
-        rankings=sorted_data,
-        get_change_class=get_change_class,
-        get_change_icon=get_change_icon,
-        format_position=format_position
+        rankings=sorted_data if significant_moves is None else significant_moves,
+        significant_only=significant_moves is not None,
+        rollups=rollups or []
     )
     
     return html_content
 
 
+class ReportStatistics:
+    """Accumulates report statistics one ranking item at a time"""
+    
+    def __init__(self):
+        self.total_keywords = 0
+        self.ranked_keywords = 0
+        self.direction_counts = {'up': 0, 'down': 0, 'new': 0, 'lost': 0, 'same': 0}
+        self.position_sum = 0
+        self.position_count = 0
+        self.top_10_count = 0
+        self.top_3_count = 0
+        self.significant_moves = 0
+    
+    def add(self, item: Dict):
+        """Fold one ranking item into the statistics"""
+        self.total_keywords += 1
+        if item.get('found_in_top_100', False):
+            self.ranked_keywords += 1
+        
+        direction = item.get('change_direction')
+        if direction in self.direction_counts:
+            self.direction_counts[direction] += 1
+        
+        position = item.get('position')
+        if position is not None:
+            self.position_sum += position
+            self.position_count += 1
+            if position <= 10:
+                self.top_10_count += 1
+            if position <= 3:
+                self.top_3_count += 1
+        
+        if item.get('significant') is True:
+            self.significant_moves += 1
+    
+    def to_dict(self) -> Dict:
+        """Return the statistics in the shape used by the report template"""
+        avg_position = self.position_sum / self.position_count if self.position_count else 0
+        
+        return {
+            'total_keywords': self.total_keywords,
+            'ranked_keywords': self.ranked_keywords,
+            'ranking_percentage': round((self.ranked_keywords / self.total_keywords * 100), 1) if self.total_keywords > 0 else 0,
+            'improvements': self.direction_counts['up'],
+            'declines': self.direction_counts['down'],
+            'new_rankings': self.direction_counts['new'],
+            'lost_rankings': self.direction_counts['lost'],
+            'no_change': self.direction_counts['same'],
+            'average_position': round(avg_position, 1),
+            'top_10_count': self.top_10_count,
+            'top_3_count': self.top_3_count,
+            'significant_moves': self.significant_moves
+        }
+
+
 def calculate_report_statistics(ranking_data: List[Dict]) -> Dict:
     """
     Calculate summary statistics for the report
@@ -53,41 +153,38 @@ def calculate_report_statistics(ranking_data: List[Dict]) -> Dict:
     Returns:
         Dictionary with statistics
     """
-    total_keywords = len(ranking_data)
-    ranked_keywords = sum(1 for item in ranking_data if item.get('found_in_top_100', False))
-    
-    # Count changes
-    improvements = sum(1 for item in ranking_data if item.get('change_direction') == 'up')
-    declines = sum(1 for item in ranking_data if item.get('change_direction') == 'down')
-    new_rankings = sum(1 for item in ranking_data if item.get('change_direction') == 'new')
-    lost_rankings = sum(1 for item in ranking_data if item.get('change_direction') == 'lost')
-    no_change = sum(1 for item in ranking_data if item.get('change_direction') == 'same')
+    stats = ReportStatistics()
+    for item in ranking_data:
+        stats.add(item)
+    return stats.to_dict()
+
+
+def group_ranking_data_by_domain(ranking_data: List[Dict]) -> Dict[str, Dict]:
+    """
+    Split ranking data by domain and compute each domain's statistics
     
-    # Calculate average position for ranked keywords
-    ranked_positions = [item.get('position') for item in ranking_data 
-                       if item.get('position') is not None]
-    avg_position = sum(ranked_positions) / len(ranked_positions) if ranked_positions else 0
+    Grouping and statistics happen in a single pass over the data.
     
-    # Top 10 count
-    top_10_count = sum(1 for item in ranking_data 
-                      if item.get('position') is not None and item.get('position') <= 10)
+    Args:
+        ranking_data: List of ranking data with a 'domain' key
+        
+    Returns:
+        Dict mapping domain to {'rankings': [...], 'stats': {...}}
+    """
+    rankings_by_domain = {}
+    stats_by_domain = {}
     
-    # Top 3 count
-    top_3_count = sum(1 for item in ranking_data 
-                     if item.get('position') is not None and item.get('position') <= 3)
+    for item in ranking_data:
+        domain = item.get('domain')
+        if domain not in rankings_by_domain:
+            rankings_by_domain[domain] = []
+            stats_by_domain[domain] = ReportStatistics()
+        rankings_by_domain[domain].append(item)
+        stats_by_domain[domain].add(item)
     
     return {
-        'total_keywords': total_keywords,
-        'ranked_keywords': ranked_keywords,
-        'ranking_percentage': round((ranked_keywords / total_keywords * 100), 1) if total_keywords > 0 else 0,
-        'improvements': improvements,
-        'declines': declines,
-        'new_rankings': new_rankings,
-        'lost_rankings': lost_rankings,
-        'no_change': no_change,
-        'average_position': round(avg_position, 1),
-        'top_10_count': top_10_count,
-        'top_3_count': top_3_count
+        domain: {'rankings': rankings, 'stats': stats_by_domain[domain].to_dict()}
+        for domain, rankings in rankings_by_domain.items()
     }
 
 
@@ -166,6 +263,9 @@ def generate_trend_analysis(keyword_id: int, days: int = 30) -> Dict:
     """
     Generate trend analysis for a specific keyword
     
+    Uses the batch trend engine; to analyze many keywords call
+    trend_analytics.get_trend_metrics once instead of this per keyword.
+    
     Args:
         keyword_id: ID of the keyword to analyze
         days: Number of days to analyze
@@ -173,45 +273,44 @@ def generate_trend_analysis(keyword_id: int, days: int = 30) -> Dict:
     Returns:
         Dictionary with trend analysis
     """
-    from app.models import Ranking
-    from datetime import date, timedelta
-    
-    # Get historical data
-    end_date = date.today()
-    start_date = end_date - timedelta(days=days)
+    from app.utils.trend_analytics import get_trend_metrics
     
-    rankings = Ranking.query.filter(
-        Ranking.keyword_id == keyword_id,
-        Ranking.check_date >= start_date,
-        Ranking.check_date <= end_date
-    ).order_by(Ranking.check_date.asc()).all()
-    
-    if not rankings:
+    metrics = get_trend_metrics(days=days, keyword_ids=[keyword_id], active_only=False).get(keyword_id)
+    if not metrics:
         return {'trend': 'insufficient_data', 'data_points': 0}
     
-    positions = [r.position for r in rankings if r.position is not None]
-    
-    if len(positions) < 2:
-        return {'trend': 'insufficient_data', 'data_points': len(positions)}
+    return metrics
+
+
+def attach_trend_metrics(ranking_data: List[Dict], days: Optional[int] = None) -> List[Dict]:
+    """
+    Add trend metrics to each ranking entry, computed for all keywords at once
     
-    # Simple trend calculation
-    first_half = positions[:len(positions)//2]
-    second_half = positions[len(positions)//2:]
+    Args:
+        ranking_data: Ranking dictionaries with a keyword_id
+        days: Length of the history window (defaults to Config.TREND_WINDOW_DAYS)
+        
+    Returns:
+        The same list, each entry updated with 'trend' and 'trend_slope'
+    """
+    from app.utils.trend_analytics import get_trend_metrics
     
-    avg_first = sum(first_half) / len(first_half)
-    avg_second = sum(second_half) / len(second_half)
+    keyword_ids = {item['keyword_id'] for item in ranking_data if item.get('keyword_id') is not None}
+    metrics = get_trend_metrics(days=days, keyword_ids=keyword_ids, active_only=False) if keyword_ids else {}
     
-    if avg_second < avg_first:  # Lower position number = better
-        trend = 'improving'
-    elif avg_second > avg_first:
-        trend = 'declining'
-    else:
-        trend = 'stable'
+    for item in ranking_data:
+        keyword_metrics = metrics.get(item.get('keyword_id'), {})
+        item['trend'] = keyword_metrics.get('trend', 'insufficient_data')
+        item['trend_slope'] = keyword_metrics.get('slope')
     
-    return {
-        'trend': trend,
-        'data_points': len(positions),
-        'first_half_avg': round(avg_first, 1),
-        'second_half_avg': round(avg_second, 1),
-        'change': round(avg_first - avg_second, 1)
-    }
\ No newline at end of file
+    return ranking_data
+
+
+def get_trend_icon(trend: str) -> str:
+    """Get icon for a trend label"""
+    icon_map = {
+        'improving': '📈',
+        'declining': '📉',
+        'stable': '➖'
+    }
+    return icon_map.get(trend, '')
\ No newline at end of file
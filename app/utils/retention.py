@@ -0,0 +1,230 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, delete, func, select
+
+from app.config import Config
+from app.models import db, Ranking, RankingChange, CompetitorPosition, RankCheckRun, RankCheckRunItem
+from app.utils.partitions import PARTITIONED_TABLES, is_partitioned, drop_expired_partitions
+
+logger = logging.getLogger(__name__)
+
+# History tables the retention job manages: date column, the columns
+# identifying one series when downsampling and, optionally, the table whose
+# downsampling age applies when none is configured for this one
+RETENTION_TABLES = {
+    'rankings': {
+        'model': Ranking,
+        'date_column': 'check_date',
+        'series': ('keyword_id',)
+    },
+    'ranking_changes': {
+        'model': RankingChange,
+        'date_column': 'change_date',
+        'series': ('keyword_id',),
+        # Keep the change recorded with each weekly check left in rankings
+        'downsample_with': 'rankings'
+    },
+    'competitor_positions': {
+        'model': CompetitorPosition,
+        'date_column': 'check_date',
+        'series': ('keyword_id', 'domain')
+    }
+}
+
+
+def delete_in_batches(model, condition, batch_size: int) -> int:
+    """
+    Delete matching rows with set-based DELETEs of at most batch_size rows
+    
+    Each batch is `DELETE ... WHERE id IN (SELECT id ... LIMIT n)` in its
+    own transaction, so memory stays flat and locks are held briefly.
+    
+    Args:
+        model: Model class with an integer id primary key
+        condition: SQL expression selecting the rows to delete
+        batch_size: Maximum rows deleted per transaction
+    
+    Returns:
+        Number of rows deleted
+    """
+    deleted = 0
+    
+    while True:
+        batch_ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        result = db.session.execute(
+            delete(model).where(model.id.in_(batch_ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def expire_table(table: str, days: int, batch_size: int) -> int:
+    """
+    Delete rows of a history table older than its retention window
+    
+    Only rows not already removed with their partition are left for the
+    batched DELETEs, i.e. at most the month the cutoff falls into.
+    
+    Args:
+        table: Key of RETENTION_TABLES
+        days: Retention window in days
+        batch_size: Maximum rows deleted per transaction
+    
+    Returns:
+        Number of rows deleted
+    """
+    spec = RETENTION_TABLES[table]
+    model = spec['model']
+    date_column = getattr(model, spec['date_column'])
+    cutoff = date.today() - timedelta(days=days)
+    
+    return delete_in_batches(model, date_column < cutoff, batch_size)
+
+
+def downsample_table(table: str, after_days: int, batch_size: int,
+                     before: Optional[date] = None) -> int:
+    """
+    Thin rows older than after_days down to the last point per series and week
+    
+    Weeks (Monday to Sunday) are processed one at a time, so every batch
+    only scans that week's rows through the date index.
+    
+    Args:
+        table: Key of RETENTION_TABLES
+        after_days: Age in days from which rows are downsampled
+        batch_size: Maximum rows deleted per transaction
+        before: Skip rows before this date (e.g. ones about to expire anyway)
+    
+    Returns:
+        Number of rows deleted
+    """
+    spec = RETENTION_TABLES[table]
+    model = spec['model']
+    date_column = getattr(model, spec['date_column'])
+    series = [getattr(model, column) for column in spec['series']]
+    
+    cutoff = date.today() - timedelta(days=after_days)
+    # Only downsample whole weeks
+    cutoff -= timedelta(days=cutoff.weekday())
+    
+    oldest_query = db.session.query(func.min(date_column)).filter(date_column < cutoff)
+    if before:
+        oldest_query = oldest_query.filter(date_column >= before)
+    oldest = oldest_query.scalar()
+    if oldest is None:
+        return 0
+    
+    deleted = 0
+    week_start = oldest - timedelta(days=oldest.weekday())
+    
+    while week_start < cutoff:
+        week_end = week_start + timedelta(days=7)
+        
+        ranked = select(
+            model.id,
+            func.row_number().over(
+                partition_by=series,
+                order_by=(date_column.desc(), model.id.desc())
+            ).label('row_number')
+        ).where(date_column >= week_start, date_column < week_end).subquery()
+        
+        deleted += delete_in_batches(
+            model,
+            and_(
+                date_column >= week_start,
+                date_column < week_end,
+                model.id.in_(select(ranked.c.id).where(ranked.c.row_number > 1))
+            ),
+            batch_size
+        )
+        week_start = week_end
+    
+    return deleted
+
+
+def expire_runs(days: int) -> int:
+    """
+    Delete run ledger entries of runs started more than days ago
+    
+    Ledger items are deleted run by run, so each transaction is bounded
+    by the number of keywords.
+    
+    Args:
+        days: Retention window in days
+    
+    Returns:
+        Number of runs deleted
+    """
+    cutoff = date.today() - timedelta(days=days)
+    run_ids = [
+        run_id for (run_id,) in db.session.query(RankCheckRun.id)
+        .filter(RankCheckRun.check_date < cutoff)
+    ]
+    
+    for run_id in run_ids:
+        db.session.execute(
+            delete(RankCheckRunItem).where(RankCheckRunItem.run_id == run_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            delete(RankCheckRun).where(RankCheckRun.id == run_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    
+    return len(run_ids)
+
+
+def apply_retention(retention_days: Optional[Dict[str, int]] = None,
+                    downsample_after_days: Optional[Dict[str, int]] = None,
+                    batch_size: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Apply the configured retention and downsampling policy to every table
+    
+    Args:
+        retention_days: Retention window per table (defaults to Config.RETENTION_DAYS)
+        downsample_after_days: Downsampling age per table (defaults to Config.DOWNSAMPLE_AFTER_DAYS)
+        batch_size: Rows per delete batch (defaults to Config.RETENTION_BATCH_SIZE)
+    
+    Returns:
+        Dictionary mapping table name to counts of 'expired' and 'downsampled'
+        rows and 'dropped_partitions'
+    """
+    retention_days = Config.RETENTION_DAYS if retention_days is None else retention_days
+    downsample_after_days = Config.DOWNSAMPLE_AFTER_DAYS if downsample_after_days is None else downsample_after_days
+    batch_size = max(1, batch_size or Config.RETENTION_BATCH_SIZE)
+    
+    summary = {}
+    
+    for table, spec in RETENTION_TABLES.items():
+        days = retention_days.get(table, 0)
+        after_days = downsample_after_days.get(table, downsample_after_days.get(spec.get('downsample_with'), 0))
+        counts = {'expired': 0, 'downsampled': 0, 'dropped_partitions': 0}
+        
+        if days > 0:
+            # Whole expired months go at once on partitioned tables
+            if table in PARTITIONED_TABLES and is_partitioned(table):
+                cutoff = date.today() - timedelta(days=days)
+                counts['dropped_partitions'] = drop_expired_partitions(table, cutoff)
+            counts['expired'] = expire_table(table, days, batch_size)
+        
+        if after_days > 0 and (days <= 0 or after_days < days):
+            before = date.today() - timedelta(days=days) if days > 0 else None
+            counts['downsampled'] = downsample_table(table, after_days, batch_size, before=before)
+        
+        summary[table] = counts
+        logger.info(
+            f"Retention on {table}: {counts['dropped_partitions']} partitions dropped, "
+            f"{counts['expired']} expired, {counts['downsampled']} downsampled"
+        )
+    
+    run_days = retention_days.get('rank_check_runs', 0)
+    if run_days > 0:
+        summary['rank_check_runs'] = {'expired': expire_runs(run_days), 'downsampled': 0, 'dropped_partitions': 0}
+    
+    return summary
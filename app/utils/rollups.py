@@ -0,0 +1,218 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, select
+
+from app.models import db, dialect_insert, Keyword, Ranking, RankingChange, RankingRollup
+from app.utils.partitions import month_start
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_PERIODS = ('week', 'month')
+
+ROLLUP_COLUMNS = (
+    'keyword_count', 'ranked_count', 'avg_position', 'top_3_count', 'top_10_count',
+    'improvements', 'declines', 'new_rankings', 'lost_rankings'
+)
+
+
+def period_bounds(day: date, period: str):
+    """
+    Return the first day of the period containing day and the first day after it
+    
+    Weeks start on Monday.
+    """
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'month':
+        start = month_start(day)
+        return start, month_start(start, 1)
+    raise ValueError(f"Unknown rollup period: {period}")
+
+
+def compute_rollup_rows(period: str, start: date, end: date,
+                        domains: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+    Aggregate one period of history per domain with a single query
+    
+    Each keyword contributes its last ranking and last change within the
+    period, so only rows dated inside [start, end) are read.
+    
+    Args:
+        period: 'week' or 'month'
+        start: First day of the period
+        end: First day after the period
+        domains: Restrict to these domains (all if None)
+    
+    Returns:
+        Row dictionaries ready to upsert into ranking_rollups
+    """
+    latest_ranking = select(
+        Ranking.keyword_id,
+        Ranking.position,
+        func.row_number().over(
+            partition_by=Ranking.keyword_id,
+            order_by=(Ranking.check_date.desc(), Ranking.id.desc())
+        ).label('row_number')
+    ).where(Ranking.check_date >= start, Ranking.check_date < end).subquery()
+    
+    latest_change = select(
+        RankingChange.keyword_id,
+        RankingChange.change_direction,
+        func.row_number().over(
+            partition_by=RankingChange.keyword_id,
+            order_by=(RankingChange.change_date.desc(), RankingChange.id.desc())
+        ).label('row_number')
+    ).where(RankingChange.change_date >= start, RankingChange.change_date < end).subquery()
+    
+    position = latest_ranking.c.position
+    direction = latest_change.c.change_direction
+    
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    
+    query = select(
+        Keyword.domain,
+        func.count().label('keyword_count'),
+        func.count(position).label('ranked_count'),
+        func.avg(position).label('avg_position'),
+        count_where(position <= 3).label('top_3_count'),
+        count_where(position <= 10).label('top_10_count'),
+        count_where(direction == 'up').label('improvements'),
+        count_where(direction == 'down').label('declines'),
+        count_where(direction == 'new').label('new_rankings'),
+        count_where(direction == 'lost').label('lost_rankings')
+    ).select_from(latest_ranking).join(
+        Keyword, Keyword.id == latest_ranking.c.keyword_id
+    ).outerjoin(
+        latest_change,
+        (latest_change.c.keyword_id == latest_ranking.c.keyword_id) & (latest_change.c.row_number == 1)
+    ).where(latest_ranking.c.row_number == 1).group_by(Keyword.domain)
+    
+    if domains is not None:
+        query = query.where(Keyword.domain.in_(list(domains)))
+    
+    rows = []
+    for row in db.session.execute(query).mappings():
+        values = {column: row[column] for column in ROLLUP_COLUMNS}
+        values['avg_position'] = float(values['avg_position']) if values['avg_position'] is not None else None
+        rows.append(dict(values, domain=row['domain'], period=period, period_start=start))
+    return rows
+
+
+def upsert_rollups(rows: List[Dict]):
+    """
+    Insert or update rollup rows; runs inside the caller's transaction
+    
+    Args:
+        rows: Row dictionaries as returned by compute_rollup_rows
+    """
+    if not rows:
+        return
+    
+    now = datetime.utcnow()
+    values = [dict(row, updated_at=now) for row in rows]
+    
+    stmt = dialect_insert(RankingRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['domain', 'period', 'period_start'],
+        set_={column: stmt.excluded[column] for column in ROLLUP_COLUMNS + ('updated_at',)}
+    )
+    db.session.execute(stmt, values)
+
+
+def refresh_rollups(day: Optional[date] = None, periods: Iterable[str] = ROLLUP_PERIODS) -> int:
+    """
+    Recompute the rollups of the periods containing day
+    
+    Called after every run; only the current week and month are read, so
+    the cost does not grow with the length of the history.
+    
+    Args:
+        day: Date whose periods are refreshed (defaults to today)
+        periods: Periods to refresh
+    
+    Returns:
+        Number of rollup rows written
+    """
+    day = day or date.today()
+    written = 0
+    
+    try:
+        for period in periods:
+            start, end = period_bounds(day, period)
+            rows = compute_rollup_rows(period, start, end)
+            upsert_rollups(rows)
+            written += len(rows)
+        
+        db.session.commit()
+        return written
+    
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing rollups for {day}: {e}")
+        raise e
+
+
+def rebuild_rollups() -> int:
+    """
+    Recompute every rollup from the full ranking history
+    
+    Returns:
+        Number of rollup rows written
+    """
+    first_date = db.session.query(func.min(Ranking.check_date)).scalar()
+    if first_date is None:
+        return 0
+    
+    written = 0
+    today = date.today()
+    
+    for period in ROLLUP_PERIODS:
+        start, end = period_bounds(first_date, period)
+        while start <= today:
+            rows = compute_rollup_rows(period, start, end)
+            upsert_rollups(rows)
+            db.session.commit()
+            written += len(rows)
+            start, end = period_bounds(end, period)
+    
+    logger.info(f"Rebuilt {written} rollup rows")
+    return written
+
+
+def get_rollups(period: str = 'week', domains: Optional[Iterable[str]] = None,
+                start: Optional[date] = None, end: Optional[date] = None,
+                limit: Optional[int] = None) -> List[Dict]:
+    """
+    Read rollup rows, oldest first
+    
+    Args:
+        period: 'week' or 'month'
+        domains: Restrict to these domains (all if None)
+        start: First period_start to include
+        end: Last period_start to include
+        limit: Keep only the latest limit periods per domain
+    
+    Returns:
+        List of rollup dictionaries
+    """
+    query = RankingRollup.query.filter(RankingRollup.period == period)
+    if domains is not None:
+        query = query.filter(RankingRollup.domain.in_(list(domains)))
+    if start:
+        query = query.filter(RankingRollup.period_start >= start)
+    if end:
+        query = query.filter(RankingRollup.period_start <= end)
+    if limit:
+        # Limit is per domain, so bound the period range instead of the row count
+        latest = query.with_entities(func.max(RankingRollup.period_start)).scalar()
+        if latest is None:
+            return []
+        earliest = latest - timedelta(weeks=limit - 1) if period == 'week' else month_start(latest, -(limit - 1))
+        query = query.filter(RankingRollup.period_start >= earliest)
+    
+    rollups = query.order_by(RankingRollup.domain, RankingRollup.period_start).all()
+    return [rollup.to_dict() for rollup in rollups]
@@ -0,0 +1,98 @@
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.models import db, dialect_insert, RankCheckRun, RankCheckRunItem
+
+logger = logging.getLogger(__name__)
+
+
+def start_run(run_id: str, total_keywords: Optional[int] = None) -> RankCheckRun:
+    """
+    Register a run, or pick up an existing one when it is being resumed
+    
+    Args:
+        run_id: Stable ID of the run (the Celery task ID of the sweep)
+        total_keywords: Number of keywords the run covers
+    
+    Returns:
+        The RankCheckRun row
+    """
+    stmt = dialect_insert(RankCheckRun).values(
+        id=run_id,
+        check_date=date.today(),
+        status='running',
+        total_keywords=total_keywords,
+        started_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=[RankCheckRun.id])
+    db.session.execute(stmt)
+    db.session.commit()
+    
+    return db.session.get(RankCheckRun, run_id)
+
+
+def get_completed_results(run_id: str, keyword_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict]:
+    """
+    Load the saved results of keywords already completed in a run
+    
+    Args:
+        run_id: ID of the run
+        keyword_ids: Restrict the lookup to these keywords (all if None)
+    
+    Returns:
+        Dictionary mapping keyword_id to its stored save result
+    """
+    query = db.session.query(RankCheckRunItem.keyword_id, RankCheckRunItem.result).filter(
+        RankCheckRunItem.run_id == run_id
+    )
+    if keyword_ids is not None:
+        query = query.filter(RankCheckRunItem.keyword_id.in_(list(keyword_ids)))
+    
+    return {keyword_id: result for keyword_id, result in query}
+
+
+def record_completed(run_id: str, results: List[Dict]):
+    """
+    Mark keywords as done in a run
+    
+    Runs inside the caller's transaction so the ledger entry is committed
+    together with the rankings it describes.
+    
+    Args:
+        run_id: ID of the run
+        results: Save result dictionaries, each with a keyword_id
+    """
+    if not results:
+        return
+    
+    now = datetime.utcnow()
+    by_keyword = {result['keyword_id']: result for result in results}
+    values = [
+        {'run_id': run_id, 'keyword_id': keyword_id, 'result': result, 'completed_at': now}
+        for keyword_id, result in by_keyword.items()
+    ]
+    
+    stmt = dialect_insert(RankCheckRunItem)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RankCheckRunItem.run_id, RankCheckRunItem.keyword_id],
+        set_={'result': stmt.excluded.result, 'completed_at': stmt.excluded.completed_at}
+    )
+    db.session.execute(stmt, values)
+
+
+def finish_run(run_id: str):
+    """
+    Mark a run as completed
+    
+    Args:
+        run_id: ID of the run
+    """
+    try:
+        db.session.query(RankCheckRun).filter_by(id=run_id).update({
+            'status': 'completed',
+            'completed_at': datetime.utcnow()
+        })
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error marking run {run_id} completed: {e}")
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config import Config
+from app.utils.serp_cache import CacheKey
+
+logger = logging.getLogger(__name__)
+
+
+def archive_file_name(key: CacheKey) -> str:
+    """Content address of a SERP: a hash of its (query, location, hl, gl, num, date) key"""
+    digest = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f"{digest}.json.gz"
+
+
+class SerpArchive:
+    """
+    Gzip-compressed archive of raw SerpAPI responses
+    
+    Responses are partitioned into one directory per check date. Each
+    partition has an index.jsonl file mapping (query, location, hl, gl,
+    num) to the archived file, so historical SERPs can be re-parsed
+    offline without new API calls.
+    """
+    
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+    
+    def _partition_dir(self, check_date: str) -> str:
+        return os.path.join(self.base_dir, check_date)
+    
+    def store(self, key: CacheKey, serp: Dict) -> str:
+        """
+        Archive one raw SERP unless it is already stored
+        
+        Args:
+            key: SERP cache key (query, location, hl, gl, num, date)
+            serp: Raw SerpAPI response
+            
+        Returns:
+            Path of the archived file
+        """
+        query, location, hl, gl, num, check_date = key
+        partition = self._partition_dir(check_date)
+        file_name = archive_file_name(key)
+        path = os.path.join(partition, file_name)
+        
+        with self._lock:
+            if os.path.exists(path):
+                return path
+        
+        os.makedirs(partition, exist_ok=True)
+        
+        # Compress outside the lock into a temporary file unique to this
+        # process and thread, so readers never see a partial archive
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(serp, f, ensure_ascii=False, separators=(',', ':'))
+        
+        entry = {
+            'query': query,
+            'location': location,
+            'hl': hl,
+            'gl': gl,
+            'num': num,
+            'file': file_name,
+            'archived_at': datetime.utcnow().isoformat()
+        }
+        
+        # The lock only serialises threads of this process: another prefork
+        # worker may archive the same SERP at once and append a duplicate
+        # index entry, which iter_index skips
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return path
+            os.replace(tmp_path, path)
+            with open(os.path.join(partition, 'index.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        
+        return path
+    
+    def load(self, key: CacheKey) -> Optional[Dict]:
+        """
+        Load an archived SERP by its key
+        
+        Args:
+            key: SERP cache key (query, location, hl, gl, num, date)
+            
+        Returns:
+            Raw SerpAPI response, or None if it was never archived
+        """
+        path = os.path.join(self._partition_dir(key[5]), archive_file_name(key))
+        if not os.path.exists(path):
+            return None
+        
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def iter_index(self, check_date: date, query: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate the index entries of one date partition
+        
+        Args:
+            check_date: Partition date
+            query: Only entries for this search text (optional)
+            
+        Yields:
+            Index entry dictionaries
+        """
+        index_path = os.path.join(self._partition_dir(check_date.isoformat()), 'index.jsonl')
+        if not os.path.exists(index_path):
+            return
+        
+        # Two workers may archive the same SERP at once; report each file once
+        seen = set()
+        with open(index_path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['file'] in seen:
+                    continue
+                seen.add(entry['file'])
+                if query is None or entry['query'] == query:
+                    yield entry
+    
+    def iter_serps(self, check_date: date, query: Optional[str] = None) -> Iterator[Tuple[Dict, Dict]]:
+        """
+        Iterate archived SERPs of one date partition
+        
+        Args:
+            check_date: Partition date
+            query: Only SERPs for this search text (optional)
+            
+        Yields:
+            Tuples of (index entry, raw SerpAPI response)
+        """
+        partition = self._partition_dir(check_date.isoformat())
+        for entry in self.iter_index(check_date, query):
+            with gzip.open(os.path.join(partition, entry['file']), 'rt', encoding='utf-8') as f:
+                yield entry, json.load(f)
+
+
+_serp_archive: Optional[SerpArchive] = None
+_serp_archive_lock = threading.Lock()
+
+
+def get_serp_archive() -> Optional[SerpArchive]:
+    """
+    Return the process-wide SERP archive
+    
+    Returns:
+        SerpArchive under SERP_ARCHIVE_DIR, or None if archiving is disabled
+    """
+    global _serp_archive
+    
+    if not Config.SERP_ARCHIVE_DIR:
+        return None
+    
+    if _serp_archive is None:
+        with _serp_archive_lock:
+            if _serp_archive is None:
+                _serp_archive = SerpArchive(Config.SERP_ARCHIVE_DIR)
+    
+    return _serp_archive
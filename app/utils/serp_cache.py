@@ -0,0 +1,97 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, str, int, str]
+
+
+def serp_cache_key(params: Dict, check_date: Optional[date] = None) -> CacheKey:
+    """
+    Build the cache key identifying one SERP
+    
+    Args:
+        params: SerpAPI search parameters
+        check_date: Day the SERP belongs to (defaults to today)
+        
+    Returns:
+        Tuple of (query, location, hl, gl, num, date)
+    """
+    check_date = check_date or date.today()
+    return (
+        params['q'],
+        params.get('location', ''),
+        params.get('hl', ''),
+        params.get('gl', ''),
+        int(params.get('num', 0)),
+        check_date.isoformat()
+    )
+
+
+class SerpCache:
+    """Thread-safe LRU cache of raw SERPs with a time-to-live"""
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: CacheKey) -> Optional[Dict]:
+        """Return the cached SERP for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: CacheKey, serp: Dict):
+        """Store a SERP, evicting the least recently used entries over the limit"""
+        if self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, serp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached SERP"""
+        with self._lock:
+            self._entries.clear()
+
+
+_serp_cache: Optional[SerpCache] = None
+_serp_cache_lock = threading.Lock()
+
+
+def get_serp_cache() -> SerpCache:
+    """
+    Return the process-wide SERP cache
+    
+    Returns:
+        SerpCache sized by SERP_CACHE_MAX_ENTRIES and SERP_CACHE_TTL
+    """
+    global _serp_cache
+    
+    if _serp_cache is None:
+        with _serp_cache_lock:
+            if _serp_cache is None:
+                _serp_cache = SerpCache(Config.SERP_CACHE_MAX_ENTRIES, Config.SERP_CACHE_TTL)
+    
+    return _serp_cache
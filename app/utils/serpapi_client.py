@@ -1,33 +1,46 @@
+import asyncio
 import requests
-import time
 import logging
-from urllib.parse import urlparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional, Tuple
 from app.config import Config
+from app.utils.rate_limiter import get_serpapi_rate_limiter
+from app.utils.serp_cache import get_serp_cache, serp_cache_key
+from app.utils.serp_archive import get_serp_archive
+from app.utils.domain_matcher import get_domain_matcher, host_suffixes, normalize_host
 
 logger = logging.getLogger(__name__)
 
+# Responses retried by search_google, each retry taking a new rate-limit token
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
 
-class SerpAPIClient:
-    """Client for interacting with SerpAPI to get search results"""
-    
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.base_url = "https://serpapi.com/search"
-        self.rate_limit_delay = Config.SERPAPI_RATE_LIMIT
+
+def retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    """
+    Seconds to wait before retrying a search
     
-    def search_google(self, keyword: str, location: str = 'United States') -> Dict:
-        """
-        Search Google for a keyword and return SERP results
+    Args:
+        retry_after: Retry-After header of the failed response, if any
+        attempt: Zero-based number of the attempt that failed
         
-        Args:
-            keyword: The search keyword
-            location: Geographic location for the search
-            
-        Returns:
-            Dict containing search results
-        """
-        params = {
+    Returns:
+        The Retry-After seconds, or exponential backoff from SERPAPI_BACKOFF_FACTOR
+    """
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return Config.SERPAPI_BACKOFF_FACTOR * (2 ** attempt)
+
+
+class SerpResultsParser:
+    """SERP parsing shared by the blocking and asyncio SerpAPI clients"""
+    
+    def _search_params(self, keyword: str, location: str) -> Dict:
+        """Build the SerpAPI query parameters for one Google search"""
+        return {
             'engine': 'google',
             'q': keyword,
             'location': location,
@@ -37,23 +50,15 @@ class SerpAPIClient:
             'safe': Config.SEARCH_CONFIG['safe'],
             'api_key': self.api_key
         }
-        
+    
+    def _archive(self, cache_key, serp_results: Dict):
+        """Keep the raw response for offline analysis; never fails the search"""
+        if self.serp_archive is None:
+            return
         try:
-            logger.info(f"Searching for keyword: {keyword}")
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            # Apply rate limiting
-            time.sleep(self.rate_limit_delay)
-            
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error searching for keyword '{keyword}': {e}")
-            return {}
+            self.serp_archive.store(cache_key, serp_results)
         except Exception as e:
-            logger.error(f"Unexpected error searching for keyword '{keyword}': {e}")
-            return {}
+            logger.error(f"Error archiving SERP for keyword '{cache_key[0]}': {e}")
     
     def find_domain_position(self, serp_results: Dict, target_domain: str) -> Tuple[Optional[int], Optional[Dict]]:
         """
@@ -68,20 +73,71 @@ class SerpAPIClient:
         """
         organic_results = serp_results.get('organic_results', [])
         
-        # Clean target domain (remove www, protocols, etc.)
-        clean_target = self._clean_domain(target_domain)
-        
-        for i, result in enumerate(organic_results, 1):
-            result_url = result.get('link', '')
-            if result_url:
-                result_domain = self._clean_domain(result_url)
-                if clean_target.lower() in result_domain.lower():
-                    logger.info(f"Found {target_domain} at position {i}")
-                    return i, result
+        # Exact host or subdomain match against the precompiled target
+        found = get_domain_matcher((target_domain,)).first_positions(organic_results)
+        if target_domain in found:
+            position, result = found[target_domain]
+            logger.info(f"Found {target_domain} at position {position}")
+            return position, result
         
         logger.info(f"Domain {target_domain} not found in top {len(organic_results)} results")
         return None, None
     
+    def build_position_index(self, serp_results: Dict) -> Dict[str, List[int]]:
+        """
+        Index every organic result position by its host in one pass
+        
+        Each host is also indexed under its parent domains, so
+        'blog.example.com' results can be looked up as 'example.com'.
+        
+        Args:
+            serp_results: Raw SERP results from SerpAPI
+            
+        Returns:
+            Dict mapping cleaned host (and parent domains) to ascending positions
+        """
+        index: Dict[str, List[int]] = {}
+        
+        for i, result in enumerate(serp_results.get('organic_results', []), 1):
+            host = normalize_host(result.get('link', ''))
+            if not host:
+                continue
+            # Skip the bare TLD, which is never a useful lookup key
+            for suffix in host_suffixes(host)[:-1]:
+                index.setdefault(suffix, []).append(i)
+        
+        return index
+    
+    def find_competitor_positions(self, serp_results: Dict, competitor_domains: List[str],
+                                  position_index: Optional[Dict[str, List[int]]] = None) -> Dict[str, Dict]:
+        """
+        Find the best position of each competitor domain in one SERP
+        
+        Args:
+            serp_results: Raw SERP results from SerpAPI
+            competitor_domains: Domains to look up
+            position_index: Index from build_position_index (built if omitted)
+            
+        Returns:
+            Dict mapping each competitor to {'position': ..., 'url': ...}
+        """
+        if position_index is None:
+            position_index = self.build_position_index(serp_results)
+        organic_results = serp_results.get('organic_results', [])
+        
+        competitors = {}
+        for domain in competitor_domains:
+            positions = position_index.get(normalize_host(domain))
+            if positions:
+                competitors[domain] = {
+                    'position': positions[0],
+                    'url': organic_results[positions[0] - 1].get('link')
+                }
+            else:
+                competitors[domain] = {'position': None, 'url': None}
+        
+        return competitors
+    
     def extract_serp_features(self, serp_results: Dict) -> Dict:
         """
         Extract additional SERP features that might be useful
@@ -116,29 +172,157 @@ class SerpAPIClient:
         Returns:
             Cleaned domain string
         """
-        if not url_or_domain:
-            return ""
+        return normalize_host(url_or_domain)
+
+
+class SerpAPIClient(SerpResultsParser):
+    """Client for interacting with SerpAPI to get search results"""
+    
+    def __init__(self, api_key: str, rate_limiter=None, serp_cache=None):
+        self.api_key = api_key
+        self.base_url = "https://serpapi.com/search"
+        self.rate_limiter = rate_limiter or get_serpapi_rate_limiter()
+        self.serp_cache = serp_cache or get_serp_cache()
+        self.serp_archive = get_serp_archive()
+        self.session = self._create_session()
+    
+    def _create_session(self) -> requests.Session:
+        """
+        Create a pooled keep-alive session retrying failed connections
+        
+        Only connection errors are retried here, as no request reached
+        SerpAPI; 429/5xx responses are retried by _get, which takes a
+        rate-limit token for every attempt.
+        
+        Returns:
+            Session reusing connections to serpapi.com across searches
+        """
+        retry = Retry(
+            total=None,
+            connect=Config.SERPAPI_MAX_RETRIES,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=Config.SERPAPI_BACKOFF_FACTOR,
+            allowed_methods=frozenset(['GET'])
+        )
+        
+        # Keep at least one connection per concurrent search
+        pool_size = max(Config.SERPAPI_POOL_SIZE, Config.SERPAPI_CONCURRENCY)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _get(self, params: Dict) -> requests.Response:
+        """
+        Send one search request, retrying 429/5xx responses and read timeouts
+        
+        Every attempt takes a token from the global SerpAPI quota, so
+        retries never exceed the budget shared by all workers.
+        
+        Args:
+            params: SerpAPI query parameters
+            
+        Returns:
+            Last response received
+        """
+        max_retries = Config.SERPAPI_MAX_RETRIES
+        
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.acquire()
+            
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=30)
+            except requests.exceptions.ReadTimeout as e:
+                if attempt == max_retries:
+                    raise
+                delay = retry_delay(None, attempt)
+                reason = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    return response
+                delay = retry_delay(response.headers.get('Retry-After'), attempt)
+                reason = f"HTTP {response.status_code}"
+            
+            logger.warning(f"Retrying search for '{params['q']}' in {delay:.1f}s after {reason}")
+            time.sleep(delay)
+    
+    def search_google(self, keyword: str, location: str = 'United States') -> Dict:
+        """
+        Search Google for a keyword and return SERP results
+        
+        Args:
+            keyword: The search keyword
+            location: Geographic location for the search
+            
+        Returns:
+            Dict containing search results
+        """
+        params = self._search_params(keyword, location)
+        
+        # The same search for another domain reuses the SERP fetched today
+        cache_key = serp_cache_key(params)
+        cached = self.serp_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached SERP for keyword: {keyword}")
+            return cached
+        
+        try:
+            logger.info(f"Searching for keyword: {keyword}")
+            response = self._get(params)
+            response.raise_for_status()
             
-        # If it looks like a URL, parse it
-        if url_or_domain.startswith(('http://', 'https://')):
-            parsed = urlparse(url_or_domain)
-            domain = parsed.netloc
-        else:
-            domain = url_or_domain
-        
-        # Remove www prefix
-        if domain.startswith('www.'):
-            domain = domain[4:]
+            serp_results = response.json()
+            if serp_results:
+                self.serp_cache.set(cache_key, serp_results)
+                self._archive(cache_key, serp_results)
+            return serp_results
             
-        # Remove trailing slashes and convert to lowercase
-        return domain.rstrip('/').lower()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error searching for keyword '{keyword}': {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"Unexpected error searching for keyword '{keyword}': {e}")
+            return {}
     
     def rate_limit_handler(self):
         """Handle rate limiting between requests"""
-        time.sleep(self.rate_limit_delay)
+        self.rate_limiter.acquire()
+
 
+_clients: Dict[str, SerpAPIClient] = {}
+_clients_lock = threading.Lock()
 
-def get_keyword_ranking(keyword: str, target_domain: str, api_key: str) -> Dict:
+
+def get_serpapi_client(api_key: str) -> SerpAPIClient:
+    """
+    Return the process-wide client for an API key
+    
+    Reusing one client keeps its pooled session, so searches share open
+    connections instead of paying a new TCP/TLS handshake each time.
+    
+    Args:
+        api_key: SerpAPI key
+        
+    Returns:
+        Shared SerpAPIClient instance
+    """
+    client = _clients.get(api_key)
+    
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = _clients[api_key] = SerpAPIClient(api_key)
+    
+    return client
+
+
+def get_keyword_ranking(keyword: str, target_domain: str, api_key: str,
+                        client: Optional[SerpAPIClient] = None) -> Dict:
     """
     Get ranking information for a specific keyword and domain
     
@@ -146,15 +330,32 @@ def get_keyword_ranking(keyword: str, target_domain: str, api_key: str) -> Dict:
         keyword: Search keyword
         target_domain: Domain to check ranking for
         api_key: SerpAPI key
+        client: Existing client to reuse (optional)
         
     Returns:
         Dict containing ranking information
     """
-    client = SerpAPIClient(api_key)
+    client = client or get_serpapi_client(api_key)
     
     # Search for the keyword
     search_results = client.search_google(keyword)
     
+    return build_ranking_data(client, keyword, target_domain, search_results)
+
+
+def build_ranking_data(client: SerpResultsParser, keyword: str, target_domain: str, search_results: Dict) -> Dict:
+    """
+    Resolve one domain's ranking from an already fetched SERP
+    
+    Args:
+        client: Client providing the SERP parsing helpers
+        keyword: Search keyword
+        target_domain: Domain to check ranking for
+        search_results: Raw SERP results from SerpAPI
+        
+    Returns:
+        Dict containing ranking information
+    """
     if not search_results:
         return {
             'keyword': keyword,
@@ -164,6 +365,7 @@ def get_keyword_ranking(keyword: str, target_domain: str, api_key: str) -> Dict:
             'url': None,
             'title': None,
             'serp_features': {},
+            'competitors': {},
             'error': 'Failed to get search results'
         }
     
@@ -173,6 +375,10 @@ def get_keyword_ranking(keyword: str, target_domain: str, api_key: str) -> Dict:
     # Extract SERP features
     serp_features = client.extract_serp_features(search_results)
     
+    # Competitor positions from the same SERP, no extra API calls
+    competitor_domains = [d for d in Config.COMPETITOR_DOMAINS if d != target_domain]
+    competitors = client.find_competitor_positions(search_results, competitor_domains) if competitor_domains else {}
+    
     ranking_data = {
         'keyword': keyword,
         'domain': target_domain,
@@ -181,6 +387,7 @@ def get_keyword_ranking(keyword: str, target_domain: str, api_key: str) -> Dict:
         'url': result_data.get('link') if result_data else None,
         'title': result_data.get('title') if result_data else None,
         'serp_features': serp_features,
+        'competitors': competitors,
         'error': None
     }
     
@@ -191,6 +398,10 @@ def batch_check_keywords(keywords: List[str], target_domain: str, api_key: str)
     """
     Check rankings for multiple keywords with rate limiting
     
+    Blocking wrapper running AsyncSerpAPIClient.batch_check_keywords in
+    its own event loop. It cannot be called from a running event loop;
+    async callers await async_serpapi_client.batch_check_keywords_async.
+    
     Args:
         keywords: List of keywords to check
         target_domain: Domain to check rankings for
@@ -198,32 +409,75 @@ def batch_check_keywords(keywords: List[str], target_domain: str, api_key: str)
         
     Returns:
         List of ranking data dictionaries
+        
+    Raises:
+        RuntimeError: If called from a running event loop
     """
-    results = []
-    client = SerpAPIClient(api_key)
+    from app.utils.async_serpapi_client import batch_check_keywords_async
     
-    for i, keyword in enumerate(keywords):
-        logger.info(f"Checking keyword {i+1}/{len(keywords)}: {keyword}")
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(
+            "batch_check_keywords() blocks and cannot run inside an event loop; "
+            "await app.utils.async_serpapi_client.batch_check_keywords_async() instead"
+        )
+    
+    return asyncio.run(batch_check_keywords_async(keywords, target_domain, api_key))
+
+
+def fetch_keyword_rankings(keywords: List[Tuple[str, str]], api_key: str,
+                           max_workers: Optional[int] = None) -> List[Tuple[Optional[Dict], Optional[Exception]]]:
+    """
+    Fetch rankings for many (keyword, domain) pairs with bounded concurrency
+    
+    Each distinct search is fetched once and every domain tracked against
+    it is resolved from that one SERP. Several searches can be in flight
+    at once while request starts stay within the global SerpAPI token
+    bucket shared by all workers.
+    
+    Args:
+        keywords: List of (keyword, target_domain) tuples
+        api_key: SerpAPI key
+        max_workers: Maximum searches in flight (defaults to SERPAPI_CONCURRENCY)
         
+    Returns:
+        List of (ranking_data, error) tuples in the same order as the input
+    """
+    max_workers = max_workers or Config.SERPAPI_CONCURRENCY
+    client = get_serpapi_client(api_key)
+    
+    # Deduplicate searches shared by several domains, keeping first-seen order
+    queries = list(dict.fromkeys(keyword for keyword, _ in keywords))
+    
+    def search(keyword):
         try:
-            ranking_data = get_keyword_ranking(keyword, target_domain, api_key)
-            results.append(ranking_data)
-            
-            # Rate limiting between requests (except for the last one)
-            if i < len(keywords) - 1:
-                client.rate_limit_handler()
-                
+            return client.search_google(keyword), None
         except Exception as e:
             logger.error(f"Error checking keyword '{keyword}': {e}")
-            results.append({
-                'keyword': keyword,
-                'domain': target_domain,
-                'position': None,
-                'found_in_top_100': False,
-                'url': None,
-                'title': None,
-                'serp_features': {},
-                'error': str(e)
-            })
-    
-    return results
\ No newline at end of file
+            return None, e
+    
+    if max_workers <= 1 or len(queries) <= 1:
+        serps = dict(zip(queries, map(search, queries)))
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+            serps = dict(zip(queries, executor.map(search, queries)))
+    
+    if len(queries) < len(keywords):
+        logger.info(f"Resolved {len(keywords)} keyword/domain pairs from {len(queries)} searches")
+    
+    results = []
+    for keyword, target_domain in keywords:
+        search_results, error = serps[keyword]
+        if error:
+            results.append((None, error))
+            continue
+        try:
+            results.append((build_ranking_data(client, keyword, target_domain, search_results), None))
+        except Exception as e:
+            logger.error(f"Error checking keyword '{keyword}': {e}")
+            results.append((None, e))
+    
+    return results
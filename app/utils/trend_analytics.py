@@ -0,0 +1,168 @@
+import logging
+import math
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app.config import Config
+from app.models import db, Keyword, Ranking
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['keyword_id', 'check_date', 'position']
+
+PERCENTILE_BANDS = (0.1, 0.5, 0.9)
+
+
+def load_history_frame(days: Optional[int] = None,
+                       keyword_ids: Optional[Iterable[int]] = None,
+                       active_only: bool = True) -> pd.DataFrame:
+    """
+    Load ranking history for many keywords with a single query
+    
+    Args:
+        days: Length of the history window (defaults to Config.TREND_WINDOW_DAYS)
+        keyword_ids: Restrict to these keywords (all if None)
+        active_only: Only include active keywords
+    
+    Returns:
+        DataFrame with keyword_id, check_date (datetime64) and position
+        (float, NaN when not ranked), sorted by keyword and date
+    """
+    days = Config.TREND_WINDOW_DAYS if days is None else days
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days)
+    
+    query = select(Ranking.keyword_id, Ranking.check_date, Ranking.position).where(
+        Ranking.check_date >= start_date,
+        Ranking.check_date <= end_date
+    )
+    if active_only:
+        query = query.join(Keyword, Keyword.id == Ranking.keyword_id).where(Keyword.is_active.is_(True))
+    if keyword_ids is not None:
+        query = query.where(Ranking.keyword_id.in_(list(keyword_ids)))
+    
+    rows = db.session.execute(query.order_by(Ranking.keyword_id, Ranking.check_date)).all()
+    
+    frame = pd.DataFrame.from_records(rows, columns=HISTORY_COLUMNS)
+    frame['check_date'] = pd.to_datetime(frame['check_date'])
+    frame['position'] = frame['position'].astype('float64')
+    return frame
+
+
+def compute_trend_metrics(history: pd.DataFrame,
+                          moving_average_points: Optional[int] = None,
+                          slope_threshold: Optional[float] = None) -> pd.DataFrame:
+    """
+    Compute trend metrics for every keyword in a history frame at once
+    
+    All metrics are grouped aggregations over the whole frame; no Python
+    loop runs per keyword. Unranked checks are ignored by the position
+    statistics but count against time in the top 10.
+    
+    Args:
+        history: Frame as returned by load_history_frame
+        moving_average_points: Ranked checks in the moving average (defaults to Config.TREND_MOVING_AVERAGE_POINTS)
+        slope_threshold: Positions per week a slope must exceed to count as a trend
+            (defaults to Config.TREND_SLOPE_THRESHOLD)
+    
+    Returns:
+        DataFrame indexed by keyword_id with columns data_points, checks,
+        latest_position, slope (positions per week, negative = improving),
+        volatility, moving_average, top_10_share, p10, p50, p90 and trend
+    """
+    moving_average_points = moving_average_points or Config.TREND_MOVING_AVERAGE_POINTS
+    slope_threshold = Config.TREND_SLOPE_THRESHOLD if slope_threshold is None else slope_threshold
+    
+    columns = ['data_points', 'checks', 'latest_position', 'slope', 'volatility',
+               'moving_average', 'top_10_share', 'p10', 'p50', 'p90', 'trend']
+    if history.empty:
+        return pd.DataFrame(columns=columns).rename_axis('keyword_id')
+    
+    history = history.sort_values(['keyword_id', 'check_date'], kind='stable')
+    by_keyword = history.groupby('keyword_id', sort=True)
+    metrics = pd.DataFrame(index=by_keyword.size().index)
+    
+    metrics['checks'] = by_keyword.size()
+    metrics['latest_position'] = by_keyword['position'].last()
+    metrics['top_10_share'] = (history['position'] <= 10).groupby(history['keyword_id']).mean()
+    
+    ranked = history[history['position'].notna()]
+    ranked_by_keyword = ranked.groupby('keyword_id', sort=True)
+    metrics['data_points'] = ranked_by_keyword.size().reindex(metrics.index, fill_value=0)
+    
+    # Least-squares slope from per-keyword sums: x in weeks, y in positions
+    x = (ranked['check_date'] - ranked['check_date'].min()).dt.days.to_numpy(dtype='float64') / 7.0
+    y = ranked['position'].to_numpy(dtype='float64')
+    sums = pd.DataFrame({
+        'keyword_id': ranked['keyword_id'].to_numpy(),
+        'n': 1.0,
+        'x': x,
+        'y': y,
+        'xx': x * x,
+        'xy': x * y
+    }).groupby('keyword_id', sort=True).sum()
+    denominator = sums['n'] * sums['xx'] - sums['x'] ** 2
+    slope = (sums['n'] * sums['xy'] - sums['x'] * sums['y']) / denominator.where(denominator > 0)
+    metrics['slope'] = slope.reindex(metrics.index)
+    
+    # Volatility: spread of the moves between consecutive ranked checks
+    moves = ranked_by_keyword['position'].diff()
+    metrics['volatility'] = moves.groupby(ranked['keyword_id']).std(ddof=0).reindex(metrics.index)
+    
+    metrics['moving_average'] = (
+        ranked_by_keyword.tail(moving_average_points)
+        .groupby('keyword_id')['position'].mean()
+        .reindex(metrics.index)
+    )
+    
+    bands = ranked_by_keyword['position'].quantile(list(PERCENTILE_BANDS)).unstack()
+    for band in PERCENTILE_BANDS:
+        metrics[f'p{int(band * 100)}'] = bands[band].reindex(metrics.index) if band in bands else np.nan
+    
+    metrics['trend'] = np.select(
+        [
+            metrics['data_points'] < 2,
+            metrics['slope'] <= -slope_threshold,
+            metrics['slope'] >= slope_threshold
+        ],
+        ['insufficient_data', 'improving', 'declining'],
+        default='stable'
+    )
+    
+    metrics.index.name = 'keyword_id'
+    return metrics[columns]
+
+
+def _json_value(value, digits: int = 2):
+    """Convert a numpy scalar to a JSON-safe Python value, mapping NaN to None"""
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else round(float(value), digits)
+    return value
+
+
+def get_trend_metrics(days: Optional[int] = None,
+                      keyword_ids: Optional[Iterable[int]] = None,
+                      active_only: bool = True) -> Dict[int, Dict]:
+    """
+    Load history and compute trend metrics for many keywords
+    
+    Args:
+        days: Length of the history window (defaults to Config.TREND_WINDOW_DAYS)
+        keyword_ids: Restrict to these keywords (all if None)
+        active_only: Only include active keywords
+    
+    Returns:
+        Dictionary mapping keyword_id to a JSON-safe metrics dictionary
+    """
+    metrics = compute_trend_metrics(load_history_frame(days, keyword_ids, active_only))
+    
+    return {
+        int(keyword_id): {column: _json_value(value) for column, value in row.items()}
+        for keyword_id, row in zip(metrics.index, metrics.to_dict('records'))
+    }
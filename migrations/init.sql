@@ -17,9 +17,34 @@ CREATE TABLE IF NOT EXISTS keywords (
 CREATE INDEX IF NOT EXISTS idx_keywords_active ON keywords(is_active);
 CREATE INDEX IF NOT EXISTS idx_keywords_domain ON keywords(domain);
 
--- Create the rankings table
+-- Create a function to add monthly range partitions to a partitioned table.
+-- Partitions are named <table>_yYYYYmMM; app/utils/partitions.py keeps
+-- creating upcoming months with the same scheme.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(
+    parent_table TEXT,
+    from_month DATE,
+    to_month DATE
+)
+RETURNS VOID AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+BEGIN
+    WHILE month_start <= to_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent_table || '_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+            parent_table,
+            month_start,
+            (month_start + INTERVAL '1 month')::DATE
+        );
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the rankings table (range partitioned by month on check_date)
 CREATE TABLE IF NOT EXISTS rankings (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
     position INTEGER,
     url TEXT,
@@ -29,20 +54,24 @@ CREATE TABLE IF NOT EXISTS rankings (
     check_date DATE NOT NULL DEFAULT CURRENT_DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
-    -- Constraints
+    -- Constraints (the partition key must be part of every unique constraint)
+    PRIMARY KEY (id, check_date),
     CONSTRAINT positive_position CHECK (position > 0 OR position IS NULL),
-    CONSTRAINT valid_check_date CHECK (check_date <= CURRENT_DATE)
-);
+    CONSTRAINT valid_check_date CHECK (check_date <= CURRENT_DATE),
+    CONSTRAINT uq_rankings_keyword_date UNIQUE (keyword_id, check_date)
+) PARTITION BY RANGE (check_date);
+
+-- Rows outside every monthly partition land in the default partition
+CREATE TABLE IF NOT EXISTS rankings_default PARTITION OF rankings DEFAULT;
 
--- Create indexes on rankings table
+-- Create indexes on rankings table (created on every partition)
 CREATE INDEX IF NOT EXISTS idx_rankings_keyword_id ON rankings(keyword_id);
 CREATE INDEX IF NOT EXISTS idx_rankings_check_date ON rankings(check_date);
 CREATE INDEX IF NOT EXISTS idx_rankings_position ON rankings(position);
-CREATE INDEX IF NOT EXISTS idx_rankings_keyword_date ON rankings(keyword_id, check_date);
 
--- Create the ranking_changes table
+-- Create the ranking_changes table (range partitioned by month on change_date)
 CREATE TABLE IF NOT EXISTS ranking_changes (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
     previous_position INTEGER,
     current_position INTEGER,
@@ -52,17 +81,94 @@ CREATE TABLE IF NOT EXISTS ranking_changes (
     change_date DATE NOT NULL DEFAULT CURRENT_DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
-    -- Constraints
+    -- Constraints (the partition key must be part of every unique constraint)
+    PRIMARY KEY (id, change_date),
     CONSTRAINT valid_change_direction CHECK (change_direction IN ('up', 'down', 'new', 'lost', 'same')),
     CONSTRAINT valid_change_magnitude CHECK (change_magnitude IN ('major', 'moderate', 'minor', 'none')),
-    CONSTRAINT valid_change_date CHECK (change_date <= CURRENT_DATE)
-);
+    CONSTRAINT valid_change_date CHECK (change_date <= CURRENT_DATE),
+    CONSTRAINT uq_ranking_changes_keyword_date UNIQUE (keyword_id, change_date)
+) PARTITION BY RANGE (change_date);
+
+CREATE TABLE IF NOT EXISTS ranking_changes_default PARTITION OF ranking_changes DEFAULT;
 
--- Create indexes on ranking_changes table
+-- Create indexes on ranking_changes table (created on every partition)
 CREATE INDEX IF NOT EXISTS idx_ranking_changes_keyword_id ON ranking_changes(keyword_id);
 CREATE INDEX IF NOT EXISTS idx_ranking_changes_date ON ranking_changes(change_date);
 CREATE INDEX IF NOT EXISTS idx_ranking_changes_direction ON ranking_changes(change_direction);
 
+-- Create partitions for the current month and the next three
+SELECT create_monthly_partitions('rankings', CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE);
+SELECT create_monthly_partitions('ranking_changes', CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE);
+
+-- Create the keyword_current_state table (latest ranking and change per keyword)
+CREATE TABLE IF NOT EXISTS keyword_current_state (
+    keyword_id INTEGER PRIMARY KEY REFERENCES keywords(id) ON DELETE CASCADE,
+    position INTEGER,
+    url TEXT,
+    title TEXT,
+    found_in_top_100 BOOLEAN DEFAULT false,
+    serp_features JSONB,
+    check_date DATE NOT NULL,
+    previous_position INTEGER,
+    position_change INTEGER,
+    change_direction VARCHAR(50),
+    change_magnitude VARCHAR(50),
+    change_date DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create the competitor_positions table (competitor ranks taken from the same SERP)
+CREATE TABLE IF NOT EXISTS competitor_positions (
+    id SERIAL PRIMARY KEY,
+    keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
+    domain VARCHAR(255) NOT NULL,
+    position INTEGER,
+    url TEXT,
+    check_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    
+    CONSTRAINT uq_competitor_positions_keyword_date_domain UNIQUE (keyword_id, check_date, domain)
+);
+
+-- Create the run ledger tables (per-keyword progress of each weekly sweep)
+CREATE TABLE IF NOT EXISTS rank_check_runs (
+    id VARCHAR(255) PRIMARY KEY,
+    check_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    status VARCHAR(50) NOT NULL DEFAULT 'running',
+    total_keywords INTEGER,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS rank_check_run_items (
+    run_id VARCHAR(255) REFERENCES rank_check_runs(id) ON DELETE CASCADE,
+    keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
+    result JSONB,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (run_id, keyword_id)
+);
+
+-- Create the ranking_rollups table (per-domain aggregates per week and month)
+CREATE TABLE IF NOT EXISTS ranking_rollups (
+    id SERIAL PRIMARY KEY,
+    domain VARCHAR(255) NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    period_start DATE NOT NULL,
+    keyword_count INTEGER NOT NULL DEFAULT 0,
+    ranked_count INTEGER NOT NULL DEFAULT 0,
+    avg_position DOUBLE PRECISION,
+    top_3_count INTEGER NOT NULL DEFAULT 0,
+    top_10_count INTEGER NOT NULL DEFAULT 0,
+    improvements INTEGER NOT NULL DEFAULT 0,
+    declines INTEGER NOT NULL DEFAULT 0,
+    new_rankings INTEGER NOT NULL DEFAULT 0,
+    lost_rankings INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    CONSTRAINT valid_rollup_period CHECK (period IN ('week', 'month')),
+    CONSTRAINT uq_ranking_rollups_domain_period UNIQUE (domain, period, period_start)
+);
+
 -- Insert some default keywords if none exist
 INSERT INTO keywords (keyword, domain, is_active) VALUES
     ('make.com คือ', 'contentmastery.io', true),
@@ -186,8 +292,13 @@ $$ LANGUAGE plpgsql;
 
 -- Add comments to tables for documentation
 COMMENT ON TABLE keywords IS 'Stores the list of keywords to track rankings for';
-COMMENT ON TABLE rankings IS 'Stores daily ranking data for each keyword';
-COMMENT ON TABLE ranking_changes IS 'Tracks position changes between ranking checks';
+COMMENT ON TABLE rankings IS 'Stores daily ranking data for each keyword, partitioned by month';
+COMMENT ON TABLE ranking_changes IS 'Tracks position changes between ranking checks, partitioned by month';
+COMMENT ON TABLE competitor_positions IS 'Best position of each configured competitor domain per keyword check';
+COMMENT ON TABLE keyword_current_state IS 'Latest ranking and change per keyword, upserted on every save';
+COMMENT ON TABLE ranking_rollups IS 'Per-domain weekly and monthly ranking aggregates, refreshed after every run';
+COMMENT ON TABLE rank_check_runs IS 'Weekly sweeps, keyed by the Celery task ID that started them';
+COMMENT ON TABLE rank_check_run_items IS 'Keywords completed within a run, skipped when the run is resumed';
 
 COMMENT ON COLUMN keywords.keyword IS 'The search term to track rankings for';
 COMMENT ON COLUMN keywords.domain IS 'The domain to check rankings for';
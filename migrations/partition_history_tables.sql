@@ -0,0 +1,168 @@
+-- Convert existing rankings and ranking_changes heap tables to monthly
+-- range partitions. New databases get this layout from init.sql.
+-- Run after unique_daily_rankings.sql, during a maintenance window: every
+-- row is copied into the new partitioned tables.
+-- The primary keys become (id, check_date) / (id, change_date) because
+-- PostgreSQL requires the partition key in every unique constraint. The
+-- ORM models keep id as their only key: ids still come from one sequence
+-- and stay unique, and other databases (SQLite) cannot autoincrement a
+-- composite key.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION create_monthly_partitions(
+    parent_table TEXT,
+    from_month DATE,
+    to_month DATE
+)
+RETURNS VOID AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+BEGIN
+    WHILE month_start <= to_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent_table || '_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+            parent_table,
+            month_start,
+            (month_start + INTERVAL '1 month')::DATE
+        );
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move the old tables aside, freeing their index and constraint names
+DROP VIEW IF EXISTS latest_rankings_with_changes;
+
+ALTER TABLE rankings RENAME TO rankings_unpartitioned;
+ALTER TABLE rankings_unpartitioned RENAME CONSTRAINT rankings_pkey TO rankings_unpartitioned_pkey;
+ALTER TABLE rankings_unpartitioned DROP CONSTRAINT IF EXISTS uq_rankings_keyword_date;
+DROP INDEX IF EXISTS idx_rankings_keyword_id;
+DROP INDEX IF EXISTS idx_rankings_check_date;
+DROP INDEX IF EXISTS idx_rankings_position;
+DROP INDEX IF EXISTS idx_rankings_keyword_date;
+
+ALTER TABLE ranking_changes RENAME TO ranking_changes_unpartitioned;
+ALTER TABLE ranking_changes_unpartitioned RENAME CONSTRAINT ranking_changes_pkey TO ranking_changes_unpartitioned_pkey;
+ALTER TABLE ranking_changes_unpartitioned DROP CONSTRAINT IF EXISTS uq_ranking_changes_keyword_date;
+DROP INDEX IF EXISTS idx_ranking_changes_keyword_id;
+DROP INDEX IF EXISTS idx_ranking_changes_date;
+DROP INDEX IF EXISTS idx_ranking_changes_direction;
+
+-- Create the partitioned tables, reusing the existing id sequences
+CREATE TABLE IF NOT EXISTS rankings (
+    id INTEGER NOT NULL DEFAULT nextval('rankings_id_seq'),
+    keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
+    position INTEGER,
+    url TEXT,
+    title TEXT,
+    found_in_top_100 BOOLEAN DEFAULT false,
+    serp_features JSONB,
+    check_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    -- Constraints (the partition key must be part of every unique constraint)
+    PRIMARY KEY (id, check_date),
+    CONSTRAINT positive_position CHECK (position > 0 OR position IS NULL),
+    CONSTRAINT valid_check_date CHECK (check_date <= CURRENT_DATE),
+    CONSTRAINT uq_rankings_keyword_date UNIQUE (keyword_id, check_date)
+) PARTITION BY RANGE (check_date);
+
+-- Rows outside every monthly partition land in the default partition
+CREATE TABLE IF NOT EXISTS rankings_default PARTITION OF rankings DEFAULT;
+
+-- Create indexes on rankings table (created on every partition)
+CREATE INDEX IF NOT EXISTS idx_rankings_keyword_id ON rankings(keyword_id);
+CREATE INDEX IF NOT EXISTS idx_rankings_check_date ON rankings(check_date);
+CREATE INDEX IF NOT EXISTS idx_rankings_position ON rankings(position);
+
+-- Create the ranking_changes table (range partitioned by month on change_date)
+CREATE TABLE IF NOT EXISTS ranking_changes (
+    id INTEGER NOT NULL DEFAULT nextval('ranking_changes_id_seq'),
+    keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
+    previous_position INTEGER,
+    current_position INTEGER,
+    position_change INTEGER,
+    change_direction VARCHAR(50),
+    change_magnitude VARCHAR(50),
+    change_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    -- Constraints (the partition key must be part of every unique constraint)
+    PRIMARY KEY (id, change_date),
+    CONSTRAINT valid_change_direction CHECK (change_direction IN ('up', 'down', 'new', 'lost', 'same')),
+    CONSTRAINT valid_change_magnitude CHECK (change_magnitude IN ('major', 'moderate', 'minor', 'none')),
+    CONSTRAINT valid_change_date CHECK (change_date <= CURRENT_DATE),
+    CONSTRAINT uq_ranking_changes_keyword_date UNIQUE (keyword_id, change_date)
+) PARTITION BY RANGE (change_date);
+
+CREATE TABLE IF NOT EXISTS ranking_changes_default PARTITION OF ranking_changes DEFAULT;
+
+-- Create indexes on ranking_changes table (created on every partition)
+CREATE INDEX IF NOT EXISTS idx_ranking_changes_keyword_id ON ranking_changes(keyword_id);
+CREATE INDEX IF NOT EXISTS idx_ranking_changes_date ON ranking_changes(change_date);
+CREATE INDEX IF NOT EXISTS idx_ranking_changes_direction ON ranking_changes(change_direction);
+
+-- Create partitions covering the existing history and the next three months
+SELECT create_monthly_partitions(
+    'rankings',
+    COALESCE((SELECT MIN(check_date) FROM rankings_unpartitioned), CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::DATE
+);
+SELECT create_monthly_partitions(
+    'ranking_changes',
+    COALESCE((SELECT MIN(change_date) FROM ranking_changes_unpartitioned), CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::DATE
+);
+
+-- Copy the data and hand the sequences over to the new tables
+INSERT INTO rankings (id, keyword_id, position, url, title, found_in_top_100, serp_features, check_date, created_at)
+SELECT id, keyword_id, position, url, title, found_in_top_100, serp_features, check_date, created_at
+FROM rankings_unpartitioned;
+
+INSERT INTO ranking_changes (id, keyword_id, previous_position, current_position, position_change,
+                             change_direction, change_magnitude, change_date, created_at)
+SELECT id, keyword_id, previous_position, current_position, position_change,
+       change_direction, change_magnitude, change_date, created_at
+FROM ranking_changes_unpartitioned;
+
+ALTER SEQUENCE rankings_id_seq OWNED BY rankings.id;
+ALTER SEQUENCE ranking_changes_id_seq OWNED BY ranking_changes.id;
+
+DROP TABLE rankings_unpartitioned;
+DROP TABLE ranking_changes_unpartitioned;
+
+-- Recreate the view on top of the partitioned tables
+CREATE OR REPLACE VIEW latest_rankings_with_changes AS
+SELECT 
+    k.id as keyword_id,
+    k.keyword,
+    k.domain,
+    k.is_active,
+    r.position,
+    r.url,
+    r.title,
+    r.found_in_top_100,
+    r.check_date,
+    rc.previous_position,
+    rc.position_change,
+    rc.change_direction,
+    rc.change_magnitude
+FROM keywords k
+LEFT JOIN LATERAL (
+    SELECT * FROM rankings 
+    WHERE keyword_id = k.id 
+    ORDER BY check_date DESC 
+    LIMIT 1
+) r ON true
+LEFT JOIN LATERAL (
+    SELECT * FROM ranking_changes 
+    WHERE keyword_id = k.id 
+    ORDER BY change_date DESC 
+    LIMIT 1
+) rc ON true
+WHERE k.is_active = true;
+
+
+COMMIT;
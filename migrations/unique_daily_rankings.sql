@@ -0,0 +1,55 @@
+-- Upgrade an existing database to one ranking per keyword per check date
+-- and add the run ledger tables. New databases get this from init.sql.
+
+BEGIN;
+
+-- Keep only the newest row of each keyword and day
+DELETE FROM rankings a
+USING rankings b
+WHERE a.keyword_id = b.keyword_id
+    AND a.check_date = b.check_date
+    AND a.id < b.id;
+
+DELETE FROM ranking_changes a
+USING ranking_changes b
+WHERE a.keyword_id = b.keyword_id
+    AND a.change_date = b.change_date
+    AND a.id < b.id;
+
+DELETE FROM competitor_positions a
+USING competitor_positions b
+WHERE a.keyword_id = b.keyword_id
+    AND a.check_date = b.check_date
+    AND a.domain = b.domain
+    AND a.id < b.id;
+
+ALTER TABLE rankings
+    ADD CONSTRAINT uq_rankings_keyword_date UNIQUE (keyword_id, check_date);
+DROP INDEX IF EXISTS idx_rankings_keyword_date;
+
+ALTER TABLE ranking_changes
+    ADD CONSTRAINT uq_ranking_changes_keyword_date UNIQUE (keyword_id, change_date);
+
+ALTER TABLE competitor_positions
+    ADD CONSTRAINT uq_competitor_positions_keyword_date_domain UNIQUE (keyword_id, check_date, domain);
+DROP INDEX IF EXISTS idx_competitor_positions_keyword_date;
+
+CREATE TABLE IF NOT EXISTS rank_check_runs (
+    id VARCHAR(255) PRIMARY KEY,
+    check_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    status VARCHAR(50) NOT NULL DEFAULT 'running',
+    total_keywords INTEGER,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS rank_check_run_items (
+    run_id VARCHAR(255) REFERENCES rank_check_runs(id) ON DELETE CASCADE,
+    keyword_id INTEGER REFERENCES keywords(id) ON DELETE CASCADE,
+    result JSONB,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (run_id, keyword_id)
+);
+
+COMMIT;